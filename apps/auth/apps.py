@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class ApiAuthConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.auth'
+    # 'auth' is taken by django.contrib.auth
+    label = 'api_auth'
+    verbose_name = 'API authentication'
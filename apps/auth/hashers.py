@@ -0,0 +1,55 @@
+"""
+Password hashers with settings-driven cost, and off-event-loop verification.
+
+The hashers keep Django's algorithm names, so existing hashes still verify and
+are upgraded to the configured cost on the user's next successful login.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+from django.db import close_old_connections
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = settings.PASSWORD_HASHER_COST['PBKDF2_ITERATIONS']
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_HASHER_COST['ARGON2_TIME_COST']
+    memory_cost = settings.PASSWORD_HASHER_COST['ARGON2_MEMORY_COST']
+    parallelism = settings.PASSWORD_HASHER_COST['ARGON2_PARALLELISM']
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    rounds = settings.PASSWORD_HASHER_COST['BCRYPT_ROUNDS']
+
+
+# Hash verification is CPU bound. Running it on a small dedicated pool keeps it
+# off the event loop and off the single thread ASGI uses for sync views, and caps
+# how many cores a burst of login attempts can occupy.
+PASSWORD_HASH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix='password-hash',
+)
+
+
+def _authenticate(request, username, password):
+    try:
+        return authenticate(request, username=username, password=password)
+    finally:
+        # Pool threads are not covered by the request_finished signal.
+        close_old_connections()
+
+
+async def authenticate_async(request, username, password):
+    """Run authenticate() (and its password hashing) on PASSWORD_HASH_EXECUTOR."""
+    return await sync_to_async(
+        _authenticate, thread_sensitive=False, executor=PASSWORD_HASH_EXECUTOR
+    )(request, username, password)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.auth.otp_delivery import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued login OTPs in batches using the configured OTP_DELIVERY transport."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+        parser.add_argument('--poll-timeout', type=int, default=5,
+                            help="Seconds to block waiting for new messages.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("OTP delivery worker started")
+        try:
+            while True:
+                sent, failed = deliver_pending(timeout=0 if options['once'] else options['poll_timeout'])
+                if sent or failed:
+                    self.stdout.write(f"Delivered {sent} OTP(s), {failed} moved to dead letter")
+                elif options['once']:
+                    break
+        except KeyboardInterrupt:
+            self.stdout.write("OTP delivery worker stopped")
@@ -0,0 +1,171 @@
+"""
+Asynchronous OTP delivery.
+
+login only enqueues a message (one Redis LPUSH); `manage.py run_otp_worker`
+drains the queue in batches and hands them to the configured transport,
+retrying failed sends with exponential backoff and moving messages that keep
+failing to a capped dead-letter list, minus their OTP. Backends and transports are selected in
+settings.OTP_DELIVERY:
+
+- RedisQueueBackend: Redis list shared by the API processes and the worker.
+- InProcessBackend: in-memory queue for tests; drain it with deliver_pending().
+- ConsoleTransport / FileTransport: local stand-ins for SMS and email providers.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..utils import REDIS_CLIENT
+
+logger = logging.getLogger(__name__)
+
+
+class RedisQueueBackend:
+    queue_key = 'otp_delivery_queue'
+    dead_letter_key = 'otp_delivery_dead_letter'
+
+    def enqueue(self, message):
+        REDIS_CLIENT.lpush(self.queue_key, json.dumps(message))
+
+    def dequeue_batch(self, size, timeout=0):
+        """
+        Block up to `timeout` seconds (0 = return immediately) for the first
+        message, then take up to size - 1 more in a single RPOP.
+        """
+        if timeout:
+            first = REDIS_CLIENT.brpop(self.queue_key, timeout=timeout)
+            if first is None:
+                return []
+            raw = [first[1]]
+        else:
+            raw = REDIS_CLIENT.rpop(self.queue_key, 1) or []
+        if size > 1 and raw:
+            raw.extend(REDIS_CLIENT.rpop(self.queue_key, size - 1) or [])
+        return [json.loads(item) for item in raw]
+
+    def dead_letter(self, messages):
+        if messages:
+            pipe = REDIS_CLIENT.pipeline(transaction=True)
+            pipe.lpush(self.dead_letter_key, *(json.dumps(message) for message in messages))
+            pipe.ltrim(self.dead_letter_key, 0, settings.OTP_DELIVERY['MAX_DEAD_LETTERS'] - 1)
+            pipe.execute()
+
+
+class InProcessBackend:
+    """Process-local queue; nothing leaves the process, so it suits tests."""
+
+    def __init__(self):
+        self.queue = deque()
+        self.dead_letters = []
+
+    def enqueue(self, message):
+        self.queue.append(message)
+
+    def dequeue_batch(self, size, timeout=0):
+        batch = []
+        while self.queue and len(batch) < size:
+            batch.append(self.queue.popleft())
+        return batch
+
+    def dead_letter(self, messages):
+        self.dead_letters.extend(messages)
+        del self.dead_letters[:-settings.OTP_DELIVERY['MAX_DEAD_LETTERS']]
+
+
+class ConsoleTransport:
+    """Print OTPs to stdout."""
+
+    def send_batch(self, messages):
+        """Send messages; return the ones that failed."""
+        for message in messages:
+            print(f"[OTP] to {message['recipient']} ({message['channel']}): {message['otp']}")
+        return []
+
+
+class FileTransport:
+    """Append OTPs as JSON lines to OTP_DELIVERY['FILE_PATH'], readable by its owner only."""
+
+    def send_batch(self, messages):
+        fd = os.open(settings.OTP_DELIVERY['FILE_PATH'], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        with open(fd, 'a') as outbox:
+            for message in messages:
+                outbox.write(json.dumps(message) + '\n')
+        return []
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.OTP_DELIVERY['BACKEND'])()
+
+
+@lru_cache(maxsize=None)
+def get_transport():
+    return import_string(settings.OTP_DELIVERY['TRANSPORT'])()
+
+
+def otp_recipient(user):
+    """(channel, recipient) for `user`'s OTPs, preferring email over SMS, or None."""
+    if user.email:
+        return 'email', user.email
+    if user.phone_number:
+        return 'sms', user.phone_number
+    return None
+
+
+def enqueue_otp_delivery(user, otp):
+    """Queue an OTP for `user`. Raises ValueError if the user has nowhere to receive it."""
+    target = otp_recipient(user)
+    if target is None:
+        raise ValueError("User has no email address or phone number to send the OTP to")
+    channel, recipient = target
+    get_backend().enqueue({
+        'user_id': user.id,
+        'channel': channel,
+        'recipient': recipient,
+        'otp': otp,
+        'created_at': int(time.time()),
+    })
+
+
+def deliver_batch(messages, backend=None, transport=None):
+    """
+    Send one batch, retrying failures with exponential backoff. Messages whose
+    OTP has already expired are dropped. Returns (sent, dead_lettered) counts.
+    """
+    backend = backend or get_backend()
+    transport = transport or get_transport()
+    config = settings.OTP_DELIVERY
+    cutoff = time.time() - settings.OTP_LIFETIME
+    pending = [message for message in messages if message['created_at'] > cutoff]
+    total = len(pending)
+
+    for attempt in range(config['MAX_RETRIES'] + 1):
+        if attempt:
+            time.sleep(config['RETRY_BACKOFF'] * 2 ** (attempt - 1))
+        try:
+            pending = transport.send_batch(pending)
+        except Exception as exc:
+            logger.warning("OTP delivery attempt %d failed: %s", attempt + 1, exc)
+        if not pending:
+            break
+
+    # Dead letters are kept for diagnosis only; the OTP itself is never stored
+    backend.dead_letter([
+        {key: value for key, value in message.items() if key != 'otp'} for message in pending
+    ])
+    return total - len(pending), len(pending)
+
+
+def deliver_pending(backend=None, transport=None, timeout=0):
+    """Drain one batch from the queue. Returns (sent, dead_lettered) counts."""
+    backend = backend or get_backend()
+    messages = backend.dequeue_batch(settings.OTP_DELIVERY['BATCH_SIZE'], timeout=timeout)
+    if not messages:
+        return 0, 0
+    return deliver_batch(messages, backend, transport)
@@ -0,0 +1,69 @@
+"""
+Sliding-window login throttle backed by Redis sorted sets.
+
+Every attempt is counted per username and per client IP before any password
+hashing, by one Lua script that prunes both windows, checks their limits and
+records the attempt atomically. A concurrent credential-stuffing burst
+therefore cannot slip past the limit: attempts over it are rejected without
+reaching the hasher. A successful login removes its attempt again.
+"""
+import time
+import uuid
+
+from django.conf import settings
+
+from ..utils import REDIS_CLIENT
+
+# KEYS: username window, IP window. ARGV: now, window, attempt id, username limit, IP limit.
+# Returns the seconds to wait (nothing recorded), or 0 once the attempt is recorded in both.
+_BEGIN_ATTEMPT_SCRIPT = REDIS_CLIENT.register_script("""
+local now, window = tonumber(ARGV[1]), tonumber(ARGV[2])
+local retry_after = 0
+for index, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[3 + index]) then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        if oldest[2] then
+            retry_after = math.max(retry_after, math.floor(tonumber(oldest[2]) + window - now) + 1)
+        end
+    end
+end
+if retry_after > 0 then
+    return retry_after
+end
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('EXPIRE', key, window)
+end
+return 0
+""")
+
+
+def _window_keys(username, client_ip):
+    return [f"login_failures_user_{username.lower()}", f"login_failures_ip_{client_ip}"]
+
+
+def begin_login_attempt(username, client_ip):
+    """
+    Count an attempt against both windows unless either is at its limit.
+    Returns (retry_after, attempt_id): retry_after is the number of seconds
+    the caller must wait (and attempt_id None), or 0 when the attempt may
+    proceed to the password check.
+    """
+    config = settings.LOGIN_THROTTLE
+    attempt_id = uuid.uuid4().hex
+    retry_after = _BEGIN_ATTEMPT_SCRIPT(
+        keys=_window_keys(username, client_ip),
+        args=[time.time(), config['WINDOW'], attempt_id,
+              config['MAX_FAILURES_PER_USERNAME'], config['MAX_FAILURES_PER_IP']],
+    )
+    return (retry_after, None) if retry_after else (0, attempt_id)
+
+
+def login_succeeded(username, client_ip, attempt_id):
+    """Clear the username window and uncount this attempt from the IP window."""
+    user_key, ip_key = _window_keys(username, client_ip)
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    pipe.delete(user_key)
+    pipe.zrem(ip_key, attempt_id)
+    pipe.execute()
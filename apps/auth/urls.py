@@ -5,5 +5,8 @@ urlpatterns = [
     path('login/', views.login, name='login'),
     path('refresh/', views.refresh, name='refresh'),
     path('logout/', views.logout, name='logout'),
+    path('logout-all/', views.logout_all, name='logout_all'),
+    path('revoke/', views.revoke_tokens, name='revoke_tokens'),
     path('verify-otp/', views.verify_otp, name='verify_otp'),
+    path('jwks/', views.jwks, name='jwks'),
 ]
\ No newline at end of file
@@ -1,20 +1,44 @@
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.views.decorators.http import require_http_methods
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_http_methods
 import jwt
 import time
 import json
 from issue_tracker_api import settings
-from ..utils import format_response, validate_request_payload, generate_tokens, require_token, blacklist_token, generate_otp, generate_temp_token
+from .hashers import authenticate_async
+from .otp_delivery import enqueue_otp_delivery, otp_recipient
+from .throttle import begin_login_attempt, login_succeeded
+from ..utils import format_response, validate_request_payload, generate_tokens, require_token, blacklist_token, generate_otp, generate_temp_token, store_otp, validate_otp, decode_token, get_jwks, is_token_revoked, revoke_user_tokens, rotate_refresh_token, revoke_refresh_family
 
 User = get_user_model()
 
+def issue_login_otp(user):
+    """
+    Generate and store a login OTP for `user`. Returns the temporary token,
+    or None if the user has no email address or phone number to receive it.
+    """
+    if otp_recipient(user) is None:
+        return None
+    otp = generate_otp()
+    temp_token = generate_temp_token(user.id)
+
+    # Store OTP in Redis with temp_token as key, expires in 5 minutes
+    store_otp(user.id, otp, temp_token)
+
+    # Delivery happens in the OTP worker; login only waits for the enqueue
+    enqueue_otp_delivery(user, otp)
+    return temp_token
+
 @csrf_exempt
 @require_http_methods(["POST", "OPTIONS"])
-def login(request):
-    """Authenticate user and return a temporary token for OTP verification."""
+async def login(request):
+    """
+    Authenticate user and return a temporary token for OTP verification.
+    Async so password hashing runs on the bounded hasher pool instead of
+    blocking the event loop; attempts over the throttle limit never hash.
+    """
     if request.method != 'POST':
         return format_response(
             message="Error : Method not allowed",
@@ -36,10 +60,23 @@ def login(request):
                 http_status=400
             )
 
-        # Authenticate user
         username = data['username']
         password = data['password']
-        user = authenticate(request, username=username, password=password)
+        client_ip = request.META.get('REMOTE_ADDR', '')
+
+        # Count the attempt before hashing; over the limit nothing reaches the hasher
+        retry_after, attempt_id = await sync_to_async(begin_login_attempt)(username, client_ip)
+        if retry_after:
+            response = format_response(
+                message="Error : Too many failed login attempts, try again later",
+                data=[],
+                http_status=429
+            )
+            response['Retry-After'] = str(retry_after)
+            return response
+
+        # Authenticate user
+        user = await authenticate_async(request, username, password)
         if user is None:
             return format_response(
                 message="Error : Invalid username or password",
@@ -47,14 +84,14 @@ def login(request):
                 http_status=401
             )
 
-        # Generate OTP and temporary token
-        otp = generate_otp()
-        temp_token = generate_temp_token(user.id)
-        
-        # Store OTP in cache with temp_token as key, expires in 5 minutes
-        cache.set(temp_token, {'user_id': user.id, 'otp': otp}, timeout=300)
-        
-        print('Login OTP', otp)        
+        await sync_to_async(login_succeeded)(username, client_ip, attempt_id)
+        temp_token = await sync_to_async(issue_login_otp)(user)
+        if temp_token is None:
+            return format_response(
+                message="Error : No email address or phone number on file to send the OTP to",
+                data=[],
+                http_status=400
+            )
         return format_response(
             message="OTP generated",
             data={'temp_token': temp_token},
@@ -90,23 +127,18 @@ def verify_otp(request):
                 http_status=400
             )
 
-        temp_token = data['temp_token']
-        stored_data = cache.get(temp_token)
-
-        if not stored_data or stored_data.get('otp') != data['otp']:
+        # validate_otp removes the OTP entry after a successful verification
+        is_valid, user_id, error_message = validate_otp(data['temp_token'], data['otp'])
+        if not is_valid:
             return format_response(
-                message="Error : Invalid or expired OTP",
+                message=error_message,
                 data=[],
                 http_status=401
             )
 
-        user_id = stored_data['user_id']
         user = User.objects.get(id=user_id)
         tokens = generate_tokens(user)
 
-        # Clean up: Remove the temp token entry after successful verification
-        cache.delete(temp_token)
-
         user_data = {
             'id': user.id,
             'username': user.username,
@@ -140,7 +172,7 @@ def verify_otp(request):
 
 @csrf_exempt
 def refresh(request):
-    """Refresh an access token using a valid refresh token and blacklist the old access token."""
+    """Rotate a refresh token into a new access/refresh pair and blacklist the old access token."""
     if request.method != 'POST':
         return format_response(
             message="Error : Method not allowed",
@@ -168,11 +200,7 @@ def refresh(request):
 
         # Decode and validate refresh token
         try:
-            payload = jwt.decode(
-                refresh_token,
-                settings.JWT_SECRET_KEY,
-                algorithms=[settings.JWT_ALGORITHM]
-            )
+            payload = decode_token(refresh_token)
 
             if payload.get('type') != 'refresh':
                 return format_response(
@@ -181,8 +209,12 @@ def refresh(request):
                     http_status=401
                 )
 
-            user_id = payload.get('user_id')
-            user = User.objects.get(id=user_id)
+            if is_token_revoked(refresh_token, payload):
+                return format_response(
+                    message="Error : Refresh token has been revoked",
+                    data=[],
+                    http_status=401
+                )
 
         except jwt.ExpiredSignatureError:
             return format_response(
@@ -190,7 +222,7 @@ def refresh(request):
                 data=[],
                 http_status=401
             )
-        except (jwt.InvalidTokenError, User.DoesNotExist):
+        except jwt.InvalidTokenError:
             return format_response(
                 message="Error : Invalid refresh token",
                 data=[],
@@ -206,26 +238,20 @@ def refresh(request):
                 http_status=400
             )
 
+        tokens, error_message = rotate_refresh_token(payload)
+        if not tokens:
+            return format_response(
+                message=error_message,
+                data=[],
+                http_status=401
+            )
+
         access_token = auth_header[len('Bearer '):].strip()
         blacklist_token(access_token)
 
-        # Create new access token
-        now = int(time.time())
-        access_payload = {
-            'user_id': user.id,
-            'exp': now + settings.JWT_ACCESS_TOKEN_LIFETIME,
-            'iat': now,
-            'type': 'access'
-        }
-        new_access_token = jwt.encode(
-            access_payload,
-            settings.JWT_SECRET_KEY,
-            algorithm=settings.JWT_ALGORITHM
-        )
-
         return format_response(
             message="Token refreshed successfully",
-            data={'access_token': new_access_token},
+            data=tokens,
             http_status=200
         )
 
@@ -237,7 +263,7 @@ def refresh(request):
         )
 
 @csrf_exempt
-@require_token
+@require_token()
 def logout(request):
     """Invalidate access and refresh tokens for logout."""
     if request.method != 'POST':
@@ -266,7 +292,7 @@ def logout(request):
 
         # Validate refresh token
         try:
-            payload = jwt.decode(refresh_token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            payload = decode_token(refresh_token)
             if payload['type'] != 'refresh':
                 return format_response(
                     message="Error : Token is not a refresh token",
@@ -286,9 +312,12 @@ def logout(request):
                 http_status=401
             )
 
-        # Blacklist both tokens
+        # Blacklist the access token and end the refresh token's family
         blacklist_token(access_token)
-        blacklist_token(refresh_token)
+        if payload.get('fid'):
+            revoke_refresh_family(payload['fid'])
+        else:
+            blacklist_token(refresh_token)
         return format_response(
             message="Logout successful",
             data=[],
@@ -299,4 +328,74 @@ def logout(request):
             message="Error : Invalid JSON",
             data=[],
             http_status=400
-        )
\ No newline at end of file
+        )
+
+@csrf_exempt
+@require_token()
+def logout_all(request):
+    """Sign the caller out everywhere by revoking every token issued to them."""
+    if request.method != 'POST':
+        return format_response(
+            message="Error : Method not allowed",
+            data=[],
+            http_status=405
+        )
+
+    revoke_user_tokens([request.user.id])
+    return format_response(
+        message="Logged out of all sessions",
+        data=[],
+        http_status=200
+    )
+
+@csrf_exempt
+@require_token(allowed_roles=['Admin'])
+def revoke_tokens(request):
+    """Revoke every outstanding token of the given users (Admin only)."""
+    if request.method != 'POST':
+        return format_response(
+            message="Error : Method not allowed",
+            data=[],
+            http_status=405
+        )
+
+    try:
+        data = json.loads(request.body)
+        required_keys = ['user_ids']
+        allowed_keys = {'user_ids'}
+        key_types = {'user_ids': list}
+        is_valid, error_message = validate_request_payload(data, required_keys, allowed_keys, key_types)
+        if not is_valid:
+            return format_response(
+                message=error_message,
+                data=[],
+                http_status=400
+            )
+
+        user_ids = data['user_ids']
+        if not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids):
+            return format_response(
+                message="Error : user_ids must be a list of integers",
+                data=[],
+                http_status=400
+            )
+
+        revoke_user_tokens(set(user_ids))
+        return format_response(
+            message="Tokens revoked successfully",
+            data={'revoked_users': len(set(user_ids))},
+            http_status=200
+        )
+    except json.JSONDecodeError:
+        return format_response(
+            message="Error : Invalid JSON",
+            data=[],
+            http_status=400
+        )
+
+@require_GET
+def jwks(request):
+    """Publish the public keys other services use to verify our tokens locally."""
+    response = JsonResponse(get_jwks())
+    response['Cache-Control'] = f"public, max-age={settings.JWKS_CACHE_SECONDS}"
+    return response
@@ -0,0 +1,127 @@
+"""
+Per-process fan-out of change events to SSE connections.
+
+Each process holds one pattern subscription to every project channel and
+copies incoming events to the asyncio queues of the connections watching
+that project, so the number of Redis connections does not grow with the
+number of clients. A connection whose queue overflows is closed; the client
+reconnects with Last-Event-ID and catches up from the stream. The same
+happens to every connection when the subscription drops, while the listener
+reconnects with exponential backoff.
+"""
+import asyncio
+import logging
+import re
+from collections import defaultdict
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+from .publisher import CHANNEL_PREFIX, project_channel
+
+logger = logging.getLogger(__name__)
+
+_STREAM_ID = re.compile(r'^\d+-\d+$')
+
+# Seconds between listener reconnection attempts: doubled from the first up to the max
+_RECONNECT_DELAY = 0.5
+_MAX_RECONNECT_DELAY = 30
+
+
+def parse_stream_id(event_id):
+    """Stream ids ('<ms>-<seq>') as comparable tuples, or None if malformed."""
+    if not event_id or not _STREAM_ID.match(event_id):
+        return None
+    milliseconds, sequence = event_id.split('-')
+    return int(milliseconds), int(sequence)
+
+
+class EventHub:
+    def __init__(self):
+        self._loop = None
+        self._client = None
+        self._listener = None
+        self._queues = defaultdict(set)
+        # Current reconnection backoff, reset once a subscription succeeds
+        self._delay = 0
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # First use, or the previous event loop is gone (e.g. between test runs)
+            self._loop = loop
+            self._client = aioredis.from_url(settings.REDIS_URL)
+            self._listener = None
+            self._queues.clear()
+        if self._listener is None or self._listener.done():
+            self._listener = loop.create_task(self._listen())
+
+    def subscribe(self, project_id):
+        self._bind()
+        queue = asyncio.Queue(maxsize=settings.EVENTS['CLIENT_BUFFER'])
+        self._queues[project_id].add(queue)
+        return queue
+
+    def unsubscribe(self, project_id, queue):
+        queues = self._queues.get(project_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[project_id]
+
+    async def replay(self, project_id, last_event_id):
+        """Events recorded after `last_event_id`, oldest first, as (id, payload) pairs."""
+        entries = await self._client.xrange(
+            project_channel(project_id),
+            min=f"({last_event_id}",
+            count=settings.EVENTS['STREAM_MAXLEN'],
+        )
+        return [(event_id.decode(), fields[b'event'].decode()) for event_id, fields in entries]
+
+    def _close_all(self):
+        """Close every connection; clients reconnect and replay from Last-Event-ID."""
+        for queues in self._queues.values():
+            for queue in queues:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+        self._queues.clear()
+
+    async def _listen(self):
+        """Relay events until the loop ends, reconnecting when the subscription drops."""
+        self._delay = 0
+        while True:
+            try:
+                await self._relay()
+            except Exception as exc:
+                logger.warning("Event listener lost its Redis subscription: %s", exc)
+            # Events published while disconnected never reach the queues
+            self._close_all()
+            self._delay = min(max(self._delay * 2, _RECONNECT_DELAY), _MAX_RECONNECT_DELAY)
+            await asyncio.sleep(self._delay)
+            if not self._queues:
+                # Nobody is listening; the next subscribe() starts a new listener
+                return
+
+    async def _relay(self):
+        pubsub = self._client.pubsub()
+        try:
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            self._delay = 0
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                project_id = int(message['channel'][len(CHANNEL_PREFIX):])
+                event_id, _, payload = message['data'].decode().partition('|')
+                for queue in list(self._queues.get(project_id, ())):
+                    try:
+                        queue.put_nowait((event_id, payload))
+                    except asyncio.QueueFull:
+                        self.unsubscribe(project_id, queue)
+                        queue.get_nowait()
+                        queue.put_nowait(None)
+        finally:
+            await pubsub.aclose()
+
+
+HUB = EventHub()
@@ -0,0 +1,46 @@
+"""
+Per-project change events.
+
+Every event is appended to the project's capped Redis stream (kept for
+Last-Event-ID resume) and published on the channel of the same name for live
+delivery, both in one Lua call.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..utils import REDIS_CLIENT
+
+CHANNEL_PREFIX = 'events_project_'
+
+# XADD then PUBLISH "<stream id>|<event json>"; returns the stream id
+_PUBLISH_SCRIPT = REDIS_CLIENT.register_script("""
+local event_id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'event', ARGV[2])
+redis.call('PUBLISH', KEYS[1], event_id .. '|' .. ARGV[2])
+return event_id
+""")
+
+
+def project_channel(project_id):
+    """Name of both the stream and the pub/sub channel of a project."""
+    return f"{CHANNEL_PREFIX}{project_id}"
+
+
+def publish_events(project_ids, kind, action, object_id, data=None):
+    """Publish one change event to each of the given projects (one round-trip)."""
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for project_id in project_ids:
+        event = json.dumps({
+            'type': kind,
+            'action': action,
+            'id': object_id,
+            'project_id': project_id,
+            'data': data or {},
+        }, cls=DjangoJSONEncoder)
+        _PUBLISH_SCRIPT(
+            keys=[project_channel(project_id)],
+            args=[settings.EVENTS['STREAM_MAXLEN'], event],
+            client=pipe,
+        )
+    pipe.execute()
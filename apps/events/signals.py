@@ -0,0 +1,70 @@
+# apps/events/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.features.models import Feature, ProjectFeature
+from apps.issues.models import Issue
+from apps.projects.models import Project
+from .publisher import publish_events
+
+
+def _action(kwargs):
+    if 'created' not in kwargs:
+        return 'deleted'
+    return 'created' if kwargs['created'] else 'updated'
+
+
+def _publish_on_commit(project_ids, kind, action, object_id, data):
+    # robust: a Redis outage is logged, it does not fail the committed request
+    transaction.on_commit(
+        lambda: publish_events(project_ids, kind, action, object_id, data),
+        robust=True,
+    )
+
+
+@receiver([post_save, post_delete], sender=Issue)
+def publish_issue_change(sender, instance, **kwargs):
+    _publish_on_commit([instance.project_id], 'issue', _action(kwargs), instance.pk, {
+        'title': instance.title,
+        'status': instance.status,
+        'priority': instance.priority,
+        'category': instance.category,
+        'project_feature_id': instance.project_feature_id,
+        'updated_at': instance.updated_at,
+    })
+
+
+@receiver([post_save, post_delete], sender=Project)
+def publish_project_change(sender, instance, **kwargs):
+    _publish_on_commit([instance.pk], 'project', _action(kwargs), instance.pk, {
+        'name': instance.name,
+        'status': instance.status,
+        'priority': instance.priority,
+        'updated_at': instance.updated_at,
+    })
+
+
+@receiver([post_save, post_delete], sender=ProjectFeature)
+def publish_project_feature_change(sender, instance, **kwargs):
+    _publish_on_commit([instance.project_id], 'project_feature', _action(kwargs), instance.pk, {
+        'feature_id': instance.feature_id,
+        'status': instance.status,
+        'priority': instance.priority,
+        'updated_at': instance.updated_at,
+    })
+
+
+@receiver(post_save, sender=Feature)
+def publish_feature_change(sender, instance, created, **kwargs):
+    """Core feature edits reach every project that uses the feature."""
+    if created:
+        return
+    project_ids = list(
+        ProjectFeature.objects.filter(feature_id=instance.pk).values_list('project_id', flat=True)
+    )
+    if project_ids:
+        _publish_on_commit(project_ids, 'feature', 'updated', instance.pk, {
+            'name': instance.name,
+            'updated_at': instance.updated_at,
+        })
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('projects/<int:project_id>/', views.project_events, name='project_events'),
+]
@@ -0,0 +1,86 @@
+import asyncio
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from apps.projects.models import Project
+from .hub import HUB, parse_stream_id
+from ..utils import format_response, require_token
+
+
+def _format_event(event_id, payload):
+    return f"id: {event_id}\ndata: {payload}\n\n"
+
+
+async def _event_stream(project_id, last_event_id):
+    queue = HUB.subscribe(project_id)
+    try:
+        yield "retry: 3000\n\n"
+        last_sent = None
+        if last_event_id:
+            for event_id, payload in await HUB.replay(project_id, last_event_id):
+                yield _format_event(event_id, payload)
+                last_sent = parse_stream_id(event_id)
+
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS['HEARTBEAT_SECONDS'])
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                # Too far behind, or the hub lost Redis: close, the client resumes from its Last-Event-ID
+                return
+            event_id, payload = item
+            # Skip live events already sent during the replay
+            if last_sent is not None and parse_stream_id(event_id) <= last_sent:
+                continue
+            yield _format_event(event_id, payload)
+    finally:
+        HUB.unsubscribe(project_id, queue)
+
+
+@csrf_exempt
+@require_token()
+async def project_events(request, project_id):
+    """
+    Stream a project's issue, project and feature changes as Server-Sent
+    Events. Send Last-Event-ID (header or ?last_event_id=) to resume.
+    Serve through the ASGI application (see asgi.py): each connection is a
+    long-lived coroutine, not a worker thread.
+    """
+    if request.method != 'GET':
+        return format_response(
+            message="Error : Method not allowed",
+            data=[],
+            http_status=405
+        )
+
+    if not isinstance(request, ASGIRequest):
+        # WSGI buffers the whole (endless) stream before sending anything
+        return format_response(
+            message="Error : Event streams are only served by the ASGI server",
+            data=[],
+            http_status=501
+        )
+
+    if not await Project.objects.filter(id=project_id, is_deleting=False).aexists():
+        return format_response(
+            message="Error : Project not found",
+            data=[],
+            http_status=404
+        )
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if last_event_id and parse_stream_id(last_event_id) is None:
+        return format_response(
+            message="Error : Invalid Last-Event-ID",
+            data=[],
+            http_status=400
+        )
+
+    response = StreamingHttpResponse(_event_stream(project_id, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class FeaturesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.features'
+    verbose_name = 'Features'
+
+    def ready(self):
+        import apps.features.signals
@@ -0,0 +1,74 @@
+"""
+Columnar project x feature matrix for the roadmap view.
+
+The matrix covers every project (except those queued for deletion) and every
+feature, read with one id query each plus a single ProjectFeature scan, and is
+encoded as two id lists plus dense row-major code arrays: cell (i, j) is at
+i * len(feature_ids) + j and holds an index into the status/priority legends,
+or null when project i does not use feature j. Encoded matrices are cached in Redis under a version
+number that the signals in apps.features.signals bump on every change, so a
+stale matrix is never served after a write.
+"""
+import json
+
+from django.conf import settings
+
+from apps.features.models import Feature, ProjectFeature
+from apps.projects.models import Project
+from ..utils import REDIS_CLIENT
+
+FEATURE_MATRIX_VERSION_KEY = 'feature_matrix_version'
+
+STATUSES = [value for value, _label in Feature.FeatureStatus.choices]
+PRIORITIES = [value for value, _label in Feature.FeaturePriority.choices]
+
+
+def build_feature_matrix():
+    """Encode every project x feature cell, skipping projects being deleted (three queries)."""
+    project_ids = list(Project.objects.filter(is_deleting=False).order_by('id').values_list('id', flat=True))
+    feature_ids = list(Feature.objects.order_by('id').values_list('id', flat=True))
+    rows = list(
+        ProjectFeature.objects.filter(project__is_deleting=False)
+        .order_by().values_list('project_id', 'feature_id', 'status', 'priority')
+    )
+    project_index = {project_id: index for index, project_id in enumerate(project_ids)}
+    feature_index = {feature_id: index for index, feature_id in enumerate(feature_ids)}
+    status_codes = {value: code for code, value in enumerate(STATUSES)}
+    priority_codes = {value: code for code, value in enumerate(PRIORITIES)}
+
+    width = len(feature_ids)
+    statuses = [None] * (len(project_ids) * width)
+    priorities = [None] * (len(project_ids) * width)
+    for project_id, feature_id, status, priority in rows:
+        if project_id not in project_index or feature_id not in feature_index:
+            # Created between the queries; it shows up on the next build
+            continue
+        cell = project_index[project_id] * width + feature_index[feature_id]
+        statuses[cell] = status_codes.get(status)
+        priorities[cell] = priority_codes.get(priority)
+
+    return {
+        'project_ids': project_ids,
+        'feature_ids': feature_ids,
+        'status_legend': STATUSES,
+        'priority_legend': PRIORITIES,
+        'status': statuses,
+        'priority': priorities,
+    }
+
+
+def get_feature_matrix():
+    """Return the cached matrix for the current version, building it on a miss."""
+    version = int(REDIS_CLIENT.get(FEATURE_MATRIX_VERSION_KEY) or 0)
+    key = f"feature_matrix_{version}"
+    cached = REDIS_CLIENT.get(key)
+    if cached:
+        return json.loads(cached)
+
+    matrix = build_feature_matrix()
+    REDIS_CLIENT.set(key, json.dumps(matrix, separators=(',', ':')), ex=settings.FEATURE_MATRIX_CACHE_SECONDS)
+    return matrix
+
+
+def invalidate_feature_matrix():
+    REDIS_CLIENT.incr(FEATURE_MATRIX_VERSION_KEY)
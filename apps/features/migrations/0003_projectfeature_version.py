@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('features', '0002_alter_projectfeature_feature_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfeature',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
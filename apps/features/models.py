@@ -1,4 +1,5 @@
 from django.db import models
+from apps.versioning import VersionedModel
 from apps.projects.models import Project
 
 class Feature(models.Model):
@@ -51,7 +52,7 @@ class Feature(models.Model):
         ordering = ['-created_at']
 
 
-class ProjectFeature(models.Model):
+class ProjectFeature(VersionedModel):
     """Association table with project-specific feature data"""
     project = models.ForeignKey(Project, on_delete=models.RESTRICT)
     feature = models.ForeignKey(Feature, on_delete=models.RESTRICT)
@@ -0,0 +1,16 @@
+# apps/features/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.projects.models import Project
+from .matrix import invalidate_feature_matrix
+from .models import Feature, ProjectFeature
+
+
+@receiver([post_save, post_delete], sender=ProjectFeature)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=Feature)
+def invalidate_feature_matrix_on_change(sender, **kwargs):
+    """Projects, features or associations changed: bump the matrix version once the write is committed."""
+    transaction.on_commit(invalidate_feature_matrix)
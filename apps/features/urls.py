@@ -6,8 +6,11 @@ urlpatterns = [
     path('create/', views.create_feature, name='create_feature'),
     path('<int:feature_id>/update/', views.update_feature, name='update_feature'),
     path('associate/', views.associate_feature_to_project, name='associate_feature'),
+    path('associate/bulk/', views.bulk_associate_features, name='bulk_associate_features'),
+    path('project-features/bulk-update/', views.bulk_update_project_features, name='bulk_update_project_features'),
     path('project-features/<int:association_id>/update/', views.update_project_feature, name='update_project_feature'),
     path('project-features/<int:association_id>/remove/', views.remove_feature_from_project, name='remove_feature_from_project'),
     path('projects-features/<int:project_id>/features/', views.list_features, name='list_features'),
+    path('matrix/', views.feature_matrix, name='feature_matrix'),
      path('projects-feature/', views.list_features_denormalized, name='list_features_with_project_info'),
 ]
\ No newline at end of file
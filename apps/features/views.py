@@ -2,10 +2,17 @@ from django.shortcuts import render
 
 # Create your views here.
 from django.views.decorators.csrf import csrf_exempt
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from issue_tracker_api import settings
 import json
 from apps.projects.models import Project
 from apps.features.models import Feature, ProjectFeature
-from ..utils import format_response, validate_request_payload
+from apps.issues.models import Issue
+from apps.versioning import VersionConflict
+from ..utils import format_response, validate_request_payload, coalesce_requests, require_permission, requested_includes, expected_version, apply_changes
+from .matrix import get_feature_matrix, invalidate_feature_matrix
 
 # Feature Management (Core Features)
 @csrf_exempt
@@ -78,7 +85,7 @@ def associate_feature_to_project(request):
             return format_response(message=error_message, data=[], http_status=400)
         
         try:
-            project = Project.objects.get(id=data['project_id'])
+            project = Project.objects.get(id=data['project_id'], is_deleting=False)
             feature = Feature.objects.get(id=data['feature_id'])
         except (Project.DoesNotExist, Feature.DoesNotExist):
             return format_response(message="Error: Project or Feature not found", data=[], http_status=404)
@@ -119,7 +126,193 @@ def associate_feature_to_project(request):
         return format_response(message=f"Error: {str(e)}", data=[], http_status=400)
 
 
+def _invalid_choice(data):
+    """Error message for a status/priority outside the model choices, or None."""
+    if 'status' in data and data['status'] not in Feature.FeatureStatus.values:
+        return f"Error: Invalid status '{data['status']}'"
+    if 'priority' in data and data['priority'] not in Feature.FeaturePriority.values:
+        return f"Error: Invalid priority '{data['priority']}'"
+    return None
+
+
+def _is_id_list(value):
+    return all(isinstance(item, int) and not isinstance(item, bool) for item in value)
+
+
+@csrf_exempt
+@require_permission('add_projectfeature')
+def bulk_associate_features(request):
+    """Associate one or many features with many projects in one request"""
+    if request.method != 'POST':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    try:
+        data = json.loads(request.body)
+        required_keys = ['project_ids', 'feature_ids']
+        allowed_keys = {'project_ids', 'feature_ids', 'status', 'priority', 'notes'}
+        key_types = {
+            'project_ids': list,
+            'feature_ids': list,
+            'status': str,
+            'priority': str,
+            'notes': str
+        }
+
+        is_valid, error_message = validate_request_payload(data, required_keys, allowed_keys, key_types)
+        if not is_valid:
+            return format_response(message=error_message, data=[], http_status=400)
+        if not _is_id_list(data['project_ids']) or not _is_id_list(data['feature_ids']):
+            return format_response(message="Error: project_ids and feature_ids must be lists of integers", data=[], http_status=400)
+        error_message = _invalid_choice(data)
+        if error_message:
+            return format_response(message=error_message, data=[], http_status=400)
+
+        project_ids, feature_ids = set(data['project_ids']), set(data['feature_ids'])
+        if len(project_ids) * len(feature_ids) > settings.BULK_MAX_ITEMS:
+            return format_response(
+                message=f"Error: At most {settings.BULK_MAX_ITEMS} associations per request",
+                data=[],
+                http_status=400
+            )
+
+        # Set-based existence checks: one query per table
+        missing_projects = project_ids - set(Project.objects.filter(id__in=project_ids, is_deleting=False).values_list('id', flat=True))
+        missing_features = feature_ids - set(Feature.objects.filter(id__in=feature_ids).values_list('id', flat=True))
+        if missing_projects or missing_features:
+            return format_response(
+                message="Error: Project or Feature not found",
+                data={'project_ids': sorted(missing_projects), 'feature_ids': sorted(missing_features)},
+                http_status=404
+            )
+
+        pairs = None
+        with transaction.atomic():
+            while True:
+                existing = set(ProjectFeature.objects.filter(
+                    project_id__in=project_ids, feature_id__in=feature_ids
+                ).values_list('project_id', 'feature_id'))
+                remaining = [
+                    (project_id, feature_id)
+                    for project_id in sorted(project_ids)
+                    for feature_id in sorted(feature_ids)
+                    if (project_id, feature_id) not in existing
+                ]
+                if remaining == pairs:
+                    # Nothing new was associated concurrently: not a duplicate, re-raise
+                    raise integrity_error
+                pairs = remaining
+                try:
+                    # Savepoint: a concurrent duplicate rolls back only this insert
+                    with transaction.atomic():
+                        ProjectFeature.objects.bulk_create([
+                            ProjectFeature(
+                                project_id=project_id,
+                                feature_id=feature_id,
+                                status=data.get('status', Feature.FeatureStatus.PROPOSED),
+                                priority=data.get('priority', Feature.FeaturePriority.MEDIUM),
+                                notes=data.get('notes')
+                            ) for project_id, feature_id in pairs
+                        ])
+                    break
+                except IntegrityError as exc:
+                    # Another request associated some of these pairs first: skip them and retry,
+                    # so 'created' lists only the rows this request inserted
+                    integrity_error = exc
+            # bulk_create sends no post_save
+            transaction.on_commit(invalidate_feature_matrix)
+
+        response_data = {
+            'created': [{'project_id': project_id, 'feature_id': feature_id} for project_id, feature_id in pairs],
+            'already_associated': len(existing),
+        }
+        return format_response(message="Features associated with projects successfully", data=response_data, http_status=201)
+
+    except json.JSONDecodeError:
+        return format_response(message="Error: Invalid JSON", data=[], http_status=400)
+    except Exception as e:
+        return format_response(message=f"Error: {str(e)}", data=[], http_status=400)
+
+
+@csrf_exempt
+@require_permission('change_projectfeature')
+def bulk_update_project_features(request):
+    """Update status/priority of many project feature associations in one request"""
+    if request.method != 'POST':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    try:
+        data = json.loads(request.body)
+        is_valid, error_message = validate_request_payload(data, ['updates'], {'updates'}, {'updates': list})
+        if not is_valid:
+            return format_response(message=error_message, data=[], http_status=400)
+
+        updates = {}
+        for item in data['updates']:
+            if not isinstance(item, dict):
+                return format_response(message="Error: Each update must be an object", data=[], http_status=400)
+            is_valid, error_message = validate_request_payload(
+                item, ['id'], {'id', 'status', 'priority'}, {'id': int, 'status': str, 'priority': str}
+            )
+            if not is_valid:
+                return format_response(message=error_message, data=[], http_status=400)
+            error_message = _invalid_choice(item)
+            if error_message:
+                return format_response(message=error_message, data=[], http_status=400)
+            updates[item['id']] = item
+        if len(updates) > settings.BULK_MAX_ITEMS:
+            return format_response(
+                message=f"Error: At most {settings.BULK_MAX_ITEMS} updates per request",
+                data=[],
+                http_status=400
+            )
+
+        with transaction.atomic():
+            project_features = ProjectFeature.objects.select_for_update().in_bulk(list(updates))
+            missing = sorted(set(updates) - set(project_features))
+            if missing:
+                return format_response(
+                    message="Error: Project feature association not found",
+                    data={'ids': missing},
+                    http_status=404
+                )
+
+            # Only rows and columns that actually change are written
+            now = timezone.now()
+            changed, fields = [], set()
+            for association_id, item in updates.items():
+                project_feature = project_features[association_id]
+                row_fields = {
+                    key for key in ('status', 'priority')
+                    if key in item and getattr(project_feature, key) != item[key]
+                }
+                if not row_fields:
+                    continue
+                for key in row_fields:
+                    setattr(project_feature, key, item[key])
+                # bulk_update does not apply auto_now; rows are locked, so the version bump is exact
+                project_feature.updated_at = now
+                project_feature.version += 1
+                changed.append(project_feature)
+                fields |= row_fields
+
+            if changed:
+                ProjectFeature.objects.bulk_update(changed, [*sorted(fields), 'updated_at', 'version'], batch_size=500)
+                transaction.on_commit(invalidate_feature_matrix)
+
+        response_data = {
+            'updated': [project_feature.id for project_feature in changed],
+            'unchanged': len(updates) - len(changed),
+        }
+        return format_response(message="Project features updated successfully", data=response_data, http_status=200)
+
+    except json.JSONDecodeError:
+        return format_response(message="Error: Invalid JSON", data=[], http_status=400)
+    except Exception as e:
+        return format_response(message=f"Error: {str(e)}", data=[], http_status=400)
+
+
 @csrf_exempt
+@coalesce_requests
 def list_features_denormalized(request):
     """List features denormalized - each feature appears once per project association"""
     if request.method != 'GET':
@@ -129,7 +322,7 @@ def list_features_denormalized(request):
         # Get all project-feature associations with related data
         project_features = ProjectFeature.objects.select_related(
             'feature', 'project'
-        ).all()
+        ).filter(project__is_deleting=False)
         
         feature_list = []
         for association in project_features:
@@ -155,6 +348,20 @@ def list_features_denormalized(request):
         return format_response(message=f"Error: {str(e)}", data=[], http_status=400)
     
     
+@csrf_exempt
+@require_permission('view_projectfeature')
+def feature_matrix(request):
+    """Every project x feature status/priority as a compact, cached columnar matrix"""
+    if request.method != 'GET':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    return format_response(
+        message="Feature matrix retrieved successfully",
+        data=get_feature_matrix(),
+        http_status=200
+    )
+
+
 @csrf_exempt
 def update_feature(request, feature_id):
     """Update a core feature's name and description"""
@@ -185,10 +392,9 @@ def update_feature(request, feature_id):
                 )
         
         # Update fields
-        for key, value in data.items():
-            if key in allowed_keys:
-                setattr(feature, key, value)
-        feature.save()
+        changed = apply_changes(feature, data, ['name', 'description'])
+        if changed:
+            feature.save(update_fields=[*changed, 'updated_at'])
         
         feature_data = {
             'id': feature.id,
@@ -208,44 +414,57 @@ def update_feature(request, feature_id):
 
 @csrf_exempt
 def update_project_feature(request, association_id):
-    """Update project-specific feature data"""
+    """Update project-specific feature data; a stale If-Match/'version' gets 409"""
     if request.method != 'POST':
         return format_response(message="Error: Method not allowed", data=[], http_status=405)
     
     try:
-        project_feature = ProjectFeature.objects.get(id=association_id)
+        project_feature = ProjectFeature.objects.select_related('project', 'feature').get(id=association_id)
         data = json.loads(request.body)
         
-        allowed_keys = {'status', 'priority', 'notes'}
+        allowed_keys = {'status', 'priority', 'notes', 'version'}
         key_types = {
             'status': str, 
             'priority': str,
-            'notes': str
+            'notes': str,
+            'version': int
         }
         
         is_valid, error_message = validate_request_payload(data, [], allowed_keys, key_types)
         if not is_valid:
             return format_response(message=error_message, data=[], http_status=400)
+
+        version, error_message = expected_version(request, data, project_feature)
+        if error_message:
+            return format_response(message=error_message, data=[], http_status=400)
         
         # Update fields
-        for key, value in data.items():
-            if key in allowed_keys:
-                setattr(project_feature, key, value)
-        project_feature.save()
+        changed = apply_changes(project_feature, data, ['status', 'priority', 'notes'])
+        try:
+            project_feature.save_versioned(changed, version)
+        except VersionConflict:
+            return format_response(
+                message="Error: Project feature was modified by another request, reload it and retry",
+                data=[],
+                http_status=409
+            )
         
         response_data = {
             'id': project_feature.id,
-            'project_id': project_feature.project.id,
+            'project_id': project_feature.project_id,
             'project_name': project_feature.project.name,
-            'feature_id': project_feature.feature.id,
+            'feature_id': project_feature.feature_id,
             'feature_name': project_feature.feature.name,
             'status': project_feature.status,
             'priority': project_feature.priority,
             'notes': project_feature.notes,
             'updated_at': project_feature.updated_at.isoformat(),
+            'version': project_feature.version,
         }
         
-        return format_response(message="Project feature updated successfully", data=response_data, http_status=200)
+        response = format_response(message="Project feature updated successfully", data=response_data, http_status=200)
+        response['ETag'] = f'"{project_feature.version}"'
+        return response
         
     except json.JSONDecodeError:
         return format_response(message="Error: Invalid JSON", data=[], http_status=400)
@@ -256,16 +475,24 @@ def update_project_feature(request, association_id):
 
 @csrf_exempt
 def list_features(request, project_id):
-    """List all features for a specific project with their project-specific data"""
+    """List all features for a specific project with their project-specific data; ?include=counts adds issue counts"""
     if request.method != 'GET':
         return format_response(message="Error: Method not allowed", data=[], http_status=405)
     
     try:
-        project = Project.objects.get(id=project_id)
+        include_counts = 'counts' in requested_includes(request)
+        # Projects queued for deletion are already gone as far as the API is concerned
+        project = Project.objects.get(id=project_id, is_deleting=False)
         project_features = ProjectFeature.objects.filter(project=project).select_related('feature')
+        if include_counts:
+            project_features = project_features.annotate(
+                issue_count=Count('issues'),
+                open_issue_count=Count('issues', filter=Q(issues__status__in=Issue.OPEN_STATUSES)),
+            )
         
-        feature_list = [
-            {
+        feature_list = []
+        for pf in project_features:
+            feature_data = {
                 'id': pf.id,
                 'feature_id': pf.feature.id,
                 'name': pf.feature.name,
@@ -275,8 +502,11 @@ def list_features(request, project_id):
                 'notes': pf.notes,
                 'associated_at': pf.created_at.isoformat(),
                 'updated_at': pf.updated_at.isoformat(),
-            } for pf in project_features
-        ]
+            }
+            if include_counts:
+                feature_data['issue_count'] = pf.issue_count
+                feature_data['open_issue_count'] = pf.open_issue_count
+            feature_list.append(feature_data)
         
         return format_response(
             message=f"Features for project '{project.name}' retrieved successfully",
@@ -290,22 +520,31 @@ def list_features(request, project_id):
 
 @csrf_exempt
 def list_all_features(request):
-    """List all core features (without project associations)"""
+    """List all core features (without project associations); ?include=counts adds project_count"""
     if request.method != 'GET':
         return format_response(message="Error: Method not allowed", data=[], http_status=405)
     
     try:
+        include_counts = 'counts' in requested_includes(request)
         features = Feature.objects.all()
-        feature_list = [
-            {
+        if include_counts:
+            # One grouped query instead of feature.projects.count() per row
+            features = features.annotate(
+                project_count=Count('projects', filter=Q(projects__is_deleting=False))
+            )
+
+        feature_list = []
+        for feature in features:
+            feature_data = {
                 'id': feature.id,
                 'name': feature.name,
                 'description': feature.description,
-                # 'project_count': feature.projects.count(),
                 'created_at': feature.created_at.isoformat(),
                 'updated_at': feature.updated_at.isoformat(),
-            } for feature in features
-        ]
+            }
+            if include_counts:
+                feature_data['project_count'] = feature.project_count
+            feature_list.append(feature_data)
         
         return format_response(message="All features retrieved successfully", data=feature_list, http_status=200)
     except Exception as e:
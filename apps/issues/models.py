@@ -1,8 +1,9 @@
 from django.db import models
+from apps.versioning import VersionedModel
 from apps.projects.models import Project
 from apps.features.models import ProjectFeature
 
-class Issue(models.Model):
+class Issue(VersionedModel):
     class Priority(models.TextChoices):
         HIGH = 'high', 'High'
         MEDIUM = 'medium', 'Medium'
@@ -20,6 +21,9 @@ class Issue(models.Model):
         CLOSED = 'closed', 'Closed'
         REOPENED = 'reopened', 'Reopened'
 
+    # Statuses counted as open in the listing counts
+    OPEN_STATUSES = [Status.OPEN, Status.IN_REVIEW, Status.REOPENED]
+
     title = models.CharField(max_length=200)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='issues')
     project_feature = models.ForeignKey(
@@ -48,6 +52,13 @@ class Issue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so post_save receivers can tell a status change
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
     def __str__(self):
         return f"{self.title} (#{self.id})"
 
@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from apps.features.models import Feature, ProjectFeature
+from apps.monitoring.queries import inspect_queries
+from apps.projects.models import Project
+from .models import Issue
+
+
+class ListIssuesQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(5):
+            project = Project.objects.create(name=f"Project {index}")
+            feature = Feature.objects.create(name=f"Feature {index}")
+            project_feature = ProjectFeature.objects.create(project=project, feature=feature)
+            Issue.objects.create(title=f"With feature {index}", project=project,
+                                 project_feature=project_feature, description="d")
+            Issue.objects.create(title=f"Without feature {index}", project=project, description="d")
+
+    def test_list_issues_has_no_repeated_queries(self):
+        # Strict mode raises QueryBudgetExceeded if project or feature is loaded per issue
+        with inspect_queries(label='list_issues', strict=True, repeat_threshold=1):
+            response = self.client.get('/api/issues/list/')
+
+        self.assertEqual(response.status_code, 200)
+        issues = response.json()['data']
+        self.assertEqual(len(issues), 10)
+        self.assertEqual(
+            {issue['project_feature'] for issue in issues},
+            {None, *(f"Feature {index}" for index in range(5))},
+        )
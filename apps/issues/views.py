@@ -2,13 +2,15 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from apps.projects.models import Project
 from apps.features.models import ProjectFeature
+from apps.versioning import VersionConflict
 from .models import Issue
-from ..utils import format_response, validate_request_payload
+from ..utils import format_response, validate_request_payload, require_permission, expected_version, apply_changes
 
 
 @csrf_exempt
+@require_permission('add_issue')
 def create_issue(request):
-    """Create a new issue (linked to a project)."""
+    """Create a new issue (linked to a project). Requires the add_issue permission."""
     if request.method != 'POST':
         return format_response("Error: Method not allowed", [], 405)
 
@@ -32,7 +34,7 @@ def create_issue(request):
 
         # Validate project exists
         try:
-            project = Project.objects.get(id=data['project'])
+            project = Project.objects.get(id=data['project'], is_deleting=False)
         except Project.DoesNotExist:
             return format_response("Error: Project not found", [], 404)
 
@@ -95,7 +97,7 @@ def list_issues(request):
         return format_response("Error: Method not allowed", [], 405)
 
     try:
-        issues = Issue.objects.all()
+        issues = Issue.objects.select_related('project', 'project_feature__feature')
         issue_list = [
             {
                 'id': issue.id,
@@ -126,42 +128,53 @@ def get_issue(request, issue_id):
         issue_data = {
             'id': issue.id,
             'title': issue.title,
-            'project': issue.project.id,
-            'project_feature': issue.project_feature.id if issue.project_feature else None,
+            'project': issue.project_id,
+            'project_feature': issue.project_feature_id,
             'priority': issue.get_priority_display(),
             'category': issue.get_category_display(),
             'status': issue.get_status_display(),
             'description': issue.description,
             'created_at': issue.created_at.isoformat(),
             'updated_at': issue.updated_at.isoformat(),
+            'version': issue.version,
         }
-        return format_response("Issue retrieved successfully", issue_data, 200)
+        response = format_response("Issue retrieved successfully", issue_data, 200)
+        response['ETag'] = f'"{issue.version}"'
+        return response
     except Issue.DoesNotExist:
         return format_response("Error: Issue not found", [], 404)
 
 
 @csrf_exempt
+@require_permission('change_issue')
 def update_issue(request, issue_id):
-    """Update an issue."""
+    """
+    Update an issue (requires change_issue). Send the version being edited as
+    If-Match (the ETag of get_issue) or a 'version' key; a stale version gets 409.
+    """
     if request.method != 'POST':
         return format_response("Error: Method not allowed", [], 405)
 
     try:
         issue = Issue.objects.get(id=issue_id)
         data = json.loads(request.body)
-        allowed_keys = {'title', 'priority', 'category', 'status', 'description'}
+        allowed_keys = {'title', 'priority', 'category', 'status', 'description', 'version'}
         key_types = {
             'title': str,
             'priority': str,
             'category': str,
             'status': str,
-            'description': str
+            'description': str,
+            'version': int
         }
 
         is_valid, error_message = validate_request_payload(data, [], allowed_keys, key_types)
         if not is_valid:
             return format_response(error_message, [], 400)
 
+        version, error_message = expected_version(request, data, issue)
+        if error_message:
+            return format_response(error_message, [], 400)
 
         if 'priority' in data and data['priority'] not in dict(Issue.Priority.choices):
             return format_response(
@@ -178,25 +191,28 @@ def update_issue(request, issue_id):
                 f"Error: Invalid status. Must be one of {list(dict(Issue.Status.choices).keys())}", [], 400
             )
 
-        for key, value in data.items():
-            if key in allowed_keys and key not in ['project', 'project_feature']:
-                setattr(issue, key, value)
-
-        issue.save()
+        changed = apply_changes(issue, data, ['title', 'priority', 'category', 'status', 'description'])
+        try:
+            issue.save_versioned(changed, version)
+        except VersionConflict:
+            return format_response("Error: Issue was modified by another request, reload it and retry", [], 409)
 
         issue_data = {
             'id': issue.id,
             'title': issue.title,
-            'project': issue.project.id,
-            'project_feature': issue.project_feature.id if issue.project_feature else None,
+            'project': issue.project_id,
+            'project_feature': issue.project_feature_id,
             'priority': issue.get_priority_display(),
             'category': issue.get_category_display(),
             'status': issue.get_status_display(),
             'description': issue.description,
             'created_at': issue.created_at.isoformat(),
             'updated_at': issue.updated_at.isoformat(),
+            'version': issue.version,
         }
-        return format_response("Issue updated successfully", issue_data, 200)
+        response = format_response("Issue updated successfully", issue_data, 200)
+        response['ETag'] = f'"{issue.version}"'
+        return response
 
     except json.JSONDecodeError:
         return format_response("Error: Invalid JSON", [], 400)
@@ -205,8 +221,9 @@ def update_issue(request, issue_id):
 
 
 @csrf_exempt
+@require_permission('delete_issue')
 def delete_issue(request, issue_id):
-    """Delete an issue."""
+    """Delete an issue. Requires the delete_issue permission."""
     if request.method != 'POST':
         return format_response("Error: Method not allowed", [], 405)
 
@@ -0,0 +1,230 @@
+"""
+Job storage and queueing backends, selected by settings.JOBS['BACKEND'].
+
+RedisBackend keeps each job in a hash and moves its id between three keys:
+the ``jobs_queue`` list, the ``jobs_processing`` sorted set (scored by the
+visibility deadline, after which an unacknowledged job is handed out again)
+and the ``jobs_delayed`` sorted set (retries waiting for their backoff).
+
+InMemoryBackend runs every job synchronously inside enqueue(), which makes
+job side effects immediate in tests.
+"""
+import json
+import time
+import traceback
+import uuid
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from ..utils import REDIS_CLIENT
+from .registry import NonRetryableJobError, get_job_spec, run_job
+
+# Pop the next job that still has a record, start its visibility timeout and
+# count the attempt atomically. KEYS: queue, processing set. ARGV: now, default
+# timeout, job key prefix. Returns {id, attempts, name, kwargs, max_retries}.
+_RESERVE_SCRIPT = REDIS_CLIENT.register_script("""
+while true do
+    local job_id = redis.call('RPOP', KEYS[1])
+    if not job_id then
+        return false
+    end
+    local key = ARGV[3] .. job_id
+    -- Expired records have nothing left to run
+    if redis.call('EXISTS', key) == 1 then
+        local timeout = tonumber(redis.call('HGET', key, 'timeout')) or tonumber(ARGV[2])
+        redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + timeout, job_id)
+        local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+        redis.call('HSET', key, 'status', 'running', 'updated_at', math.floor(tonumber(ARGV[1])))
+        local fields = redis.call('HMGET', key, 'name', 'kwargs', 'max_retries')
+        return {job_id, attempts, fields[1], fields[2], fields[3]}
+    end
+end
+""")
+
+# Move every member of the sorted set KEYS[1] scored <= ARGV[1] onto the queue KEYS[2]
+_MOVE_DUE_SCRIPT = REDIS_CLIENT.register_script("""
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, job_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('LPUSH', KEYS[2], job_id)
+end
+return #due
+""")
+
+
+def _new_record(name, kwargs, owner_id):
+    spec = get_job_spec(name)
+    now = int(time.time())
+    return {
+        'name': name,
+        'kwargs': kwargs,
+        'owner_id': owner_id,
+        'timeout': spec.timeout,
+        'status': 'queued',
+        'attempts': 0,
+        'max_retries': spec.max_retries if spec.max_retries is not None else settings.JOBS['MAX_RETRIES'],
+        'result': None,
+        'error': '',
+        'progress': None,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def retry_delay(attempts):
+    """Exponential backoff before retry number `attempts`."""
+    return settings.JOBS['RETRY_BACKOFF'] * 2 ** (attempts - 1)
+
+
+class RedisBackend:
+    queue_key = 'jobs_queue'
+    processing_key = 'jobs_processing'
+    delayed_key = 'jobs_delayed'
+
+    # Hash fields stored as JSON
+    json_fields = ('kwargs', 'result', 'progress', 'owner_id', 'timeout')
+    int_fields = ('attempts', 'max_retries', 'created_at', 'updated_at')
+
+    def _key(self, job_id):
+        return f"job_{job_id}"
+
+    def _encode(self, fields):
+        return {
+            key: json.dumps(value) if key in self.json_fields else value
+            for key, value in fields.items()
+        }
+
+    def enqueue(self, name, kwargs, owner_id=None):
+        job_id = uuid.uuid4().hex
+        pipe = REDIS_CLIENT.pipeline(transaction=True)
+        pipe.hset(self._key(job_id), mapping=self._encode(_new_record(name, kwargs, owner_id)))
+        pipe.expire(self._key(job_id), settings.JOBS['RESULT_TTL'])
+        pipe.lpush(self.queue_key, job_id)
+        pipe.execute()
+        return job_id
+
+    def get(self, job_id):
+        raw = REDIS_CLIENT.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        record = {key.decode(): value.decode() for key, value in raw.items()}
+        for key in self.json_fields:
+            record[key] = json.loads(record[key])
+        for key in self.int_fields:
+            record[key] = int(record[key])
+        record['id'] = job_id
+        return record
+
+    def _update(self, job_id, pipe=None, **fields):
+        fields['updated_at'] = int(time.time())
+        (pipe or REDIS_CLIENT).hset(self._key(job_id), mapping=self._encode(fields))
+
+    def set_progress(self, job_id, progress):
+        self._update(job_id, progress=progress)
+
+    def reserve(self):
+        """
+        Hand out the next job as (id, name, kwargs, attempts, max_retries), or
+        None. The job returns to the queue if it is not acknowledged before its
+        visibility timeout.
+        """
+        reserved = _RESERVE_SCRIPT(
+            keys=[self.queue_key, self.processing_key],
+            args=[time.time(), settings.JOBS['VISIBILITY_TIMEOUT'], self._key('')],
+        )
+        if reserved is None:
+            return None
+        job_id, attempts, name, kwargs, max_retries = reserved
+        return job_id.decode(), name.decode(), json.loads(kwargs), attempts, int(max_retries)
+
+    def complete(self, job_id, result):
+        pipe = REDIS_CLIENT.pipeline(transaction=True)
+        self._update(job_id, pipe, status='completed', result=result, error='')
+        pipe.expire(self._key(job_id), settings.JOBS['RESULT_TTL'])
+        pipe.zrem(self.processing_key, job_id)
+        pipe.execute()
+
+    def fail(self, job_id, error, retry_at=None):
+        """Record a failed attempt; schedule a retry at `retry_at` or fail the job for good."""
+        pipe = REDIS_CLIENT.pipeline(transaction=True)
+        pipe.zrem(self.processing_key, job_id)
+        if retry_at is not None:
+            self._update(job_id, pipe, status='retrying', error=error)
+            pipe.zadd(self.delayed_key, {job_id: retry_at})
+        else:
+            self._update(job_id, pipe, status='failed', error=error)
+        pipe.expire(self._key(job_id), settings.JOBS['RESULT_TTL'])
+        pipe.execute()
+
+    def requeue_due(self):
+        """Requeue jobs past their visibility timeout and retries past their backoff."""
+        now = time.time()
+        expired = _MOVE_DUE_SCRIPT(keys=[self.processing_key, self.queue_key], args=[now])
+        retried = _MOVE_DUE_SCRIPT(keys=[self.delayed_key, self.queue_key], args=[now])
+        return expired, retried
+
+
+class InMemoryBackend:
+    """Run jobs synchronously in enqueue(); records stay in process memory."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def enqueue(self, name, kwargs, owner_id=None):
+        job_id = uuid.uuid4().hex
+        record = _new_record(name, kwargs, owner_id)
+        record['id'] = job_id
+        self.jobs[job_id] = record
+
+        while True:
+            record['attempts'] += 1
+            record['status'] = 'running'
+            try:
+                record['result'] = run_job(job_id, name, kwargs)
+                record['status'] = 'completed'
+                break
+            except Exception as exc:
+                record['error'] = format_job_error(exc)
+                if isinstance(exc, NonRetryableJobError) or record['attempts'] > record['max_retries']:
+                    record['status'] = 'failed'
+                    break
+        record['updated_at'] = int(time.time())
+        return job_id
+
+    def get(self, job_id):
+        record = self.jobs.get(job_id)
+        return dict(record) if record else None
+
+    def set_progress(self, job_id, progress):
+        if job_id in self.jobs:
+            self.jobs[job_id]['progress'] = progress
+
+    def reserve(self):
+        return None
+
+    def requeue_due(self):
+        return 0, 0
+
+
+def format_job_error(exc):
+    return ''.join(traceback.format_exception_only(type(exc), exc)).strip()
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.JOBS['BACKEND'])()
+
+
+def enqueue(name, owner_id=None, **kwargs):
+    """
+    Queue the registered job `name` with keyword arguments. `owner_id` is the
+    user allowed to read the job's status besides admins. Returns the job id.
+    """
+    return get_backend().enqueue(name, kwargs, owner_id)
+
+
+def get_job(job_id):
+    """The job's record (owner, status, attempts, progress, result, error), or None."""
+    return get_backend().get(job_id)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (see apps.jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run until the queue is empty, then exit.")
+        parser.add_argument('--processes', type=int, default=0,
+                            help="Process pool size for cpu_bound jobs (0 runs them inline).")
+
+    def handle(self, *args, **options):
+        worker = Worker(processes=options['processes'], log=self.stdout.write)
+        self.stdout.write("Job worker started")
+        try:
+            if options['once']:
+                worker.drain()
+            else:
+                worker.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Job worker stopped")
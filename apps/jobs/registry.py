@@ -0,0 +1,74 @@
+"""
+Job registration.
+
+A job is a function decorated with ``@job('<name>')`` in an app's ``jobs.py``
+module; workers import every installed app's ``jobs.py`` on start. Jobs take
+JSON-serialisable keyword arguments and may return a JSON-serialisable result.
+"""
+import contextvars
+
+from django.utils.module_loading import autodiscover_modules
+
+_registry = {}
+_current_job_id = contextvars.ContextVar('current_job_id', default=None)
+
+
+class NonRetryableJobError(Exception):
+    """Raise from a job to fail it immediately, skipping the remaining retries."""
+
+
+class JobSpec:
+    """
+    A registered job. max_retries and timeout (the visibility timeout) default
+    to settings.JOBS when None; cpu_bound jobs run on the worker's process
+    pool when it has one.
+    """
+
+    def __init__(self, name, func, max_retries=None, timeout=None, cpu_bound=False):
+        self.name = name
+        self.func = func
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.cpu_bound = cpu_bound
+
+
+def job(name, max_retries=None, timeout=None, cpu_bound=False):
+    """Register the decorated function as the job `name`."""
+    def decorator(func):
+        _registry[name] = JobSpec(name, func, max_retries, timeout, cpu_bound)
+        func.job_name = name
+        return func
+    return decorator
+
+
+def get_job_spec(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Unknown job '{name}'") from None
+
+
+def autodiscover():
+    autodiscover_modules('jobs')
+
+
+def run_job(job_id, name, kwargs):
+    """
+    Call a job's function with `current_job_id` set. Module level so the
+    process pool can pickle it.
+    """
+    autodiscover()
+    token = _current_job_id.set(job_id)
+    try:
+        return get_job_spec(name).func(**kwargs)
+    finally:
+        _current_job_id.reset(token)
+
+
+def set_progress(**progress):
+    """Publish progress for the running job; shown by the job status API."""
+    from .backends import get_backend
+
+    job_id = _current_job_id.get()
+    if job_id is not None:
+        get_backend().set_progress(job_id, progress)
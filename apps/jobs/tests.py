@@ -0,0 +1,148 @@
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+
+from apps.features.models import Feature, ProjectFeature
+from apps.issues.models import Issue
+from apps.projects.models import Project
+from apps.users.models import CustomUser
+from apps.utils import generate_tokens
+from .backends import enqueue, get_backend, get_job
+from .registry import NonRetryableJobError, job, set_progress
+
+IN_MEMORY_JOBS = {
+    'BACKEND': 'apps.jobs.backends.InMemoryBackend',
+    'VISIBILITY_TIMEOUT': 300,
+    'MAX_RETRIES': 2,
+    'RETRY_BACKOFF': 0,
+    'RESULT_TTL': 60,
+    'POLL_INTERVAL': 1,
+}
+
+calls = []
+
+
+@job('tests.add')
+def add(a, b):
+    set_progress(step='adding')
+    return a + b
+
+
+@job('tests.flaky')
+def flaky(failures):
+    calls.append(1)
+    if len(calls) <= failures:
+        raise RuntimeError("temporary failure")
+    return len(calls)
+
+
+@job('tests.broken')
+def broken():
+    calls.append(1)
+    raise NonRetryableJobError("bad input")
+
+
+@override_settings(JOBS=IN_MEMORY_JOBS)
+class InMemoryBackendTests(TestCase):
+    def setUp(self):
+        # get_backend() caches the backend built from the settings it first saw
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+        calls.clear()
+
+    def test_job_runs_inside_enqueue(self):
+        job_id = enqueue('tests.add', owner_id=7, a=2, b=3)
+
+        record = get_job(job_id)
+        self.assertEqual(record['status'], 'completed')
+        self.assertEqual(record['result'], 5)
+        self.assertEqual(record['attempts'], 1)
+        self.assertEqual(record['progress'], {'step': 'adding'})
+        self.assertEqual(record['owner_id'], 7)
+
+    def test_failed_attempts_are_retried(self):
+        job_id = enqueue('tests.flaky', failures=2)
+
+        record = get_job(job_id)
+        self.assertEqual(record['status'], 'completed')
+        self.assertEqual(record['attempts'], 3)
+        self.assertEqual(record['result'], 3)
+
+    def test_job_fails_after_max_retries(self):
+        job_id = enqueue('tests.flaky', failures=10)
+
+        record = get_job(job_id)
+        self.assertEqual(record['status'], 'failed')
+        self.assertEqual(record['attempts'], IN_MEMORY_JOBS['MAX_RETRIES'] + 1)
+        self.assertIn('temporary failure', record['error'])
+
+    def test_non_retryable_error_fails_immediately(self):
+        job_id = enqueue('tests.broken')
+
+        record = get_job(job_id)
+        self.assertEqual(record['status'], 'failed')
+        self.assertEqual(len(calls), 1)
+        self.assertIn('bad input', record['error'])
+
+    def test_unknown_job_id(self):
+        self.assertIsNone(get_job('missing'))
+
+
+@override_settings(JOBS=IN_MEMORY_JOBS)
+class ProjectDeletionJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        admin_group, _ = Group.objects.get_or_create(name='Admin')
+        cls.admin = CustomUser.objects.create_user(username='admin', email='admin@example.com')
+        cls.admin.groups.add(admin_group)
+        cls.other = CustomUser.objects.create_user(username='other', email='other@example.com')
+
+    def setUp(self):
+        get_backend.cache_clear()
+        self.addCleanup(get_backend.cache_clear)
+
+    def test_delete_project_removes_issues_and_reports_status(self):
+        project = Project.objects.create(name="Doomed")
+        for index in range(3):
+            Issue.objects.create(title=f"Issue {index}", project=project, description="d")
+
+        admin_token = generate_tokens(self.admin)['access_token']
+        response = self.client.post(f'/api/projects/delete/{project.id}/', HTTP_AUTHORIZATION=f"Bearer {admin_token}")
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['data']['job_id']
+        self.assertFalse(Project.objects.filter(id=project.id).exists())
+        self.assertFalse(Issue.objects.filter(project_id=project.id).exists())
+
+        response = self.client.get(f'/api/jobs/{job_id}/', HTTP_AUTHORIZATION=f"Bearer {admin_token}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['status'], 'completed')
+        self.assertEqual(response.json()['data']['result'], {'deleted_issues': 3})
+
+    def test_delete_project_requires_permission(self):
+        project = Project.objects.create(name="Kept")
+        token = generate_tokens(self.other)['access_token']
+
+        response = self.client.post(f'/api/projects/delete/{project.id}/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Project.objects.get(id=project.id).is_deleting)
+
+    def test_job_blocked_by_features_deletes_nothing(self):
+        project = Project.objects.create(name="Blocked", is_deleting=True)
+        Issue.objects.create(title="Issue", project=project, description="d")
+        # Associated after the view's check, before the job ran
+        ProjectFeature.objects.create(project=project, feature=Feature.objects.create(name="Late"))
+
+        record = get_job(enqueue('projects.delete_project', project_id=project.id))
+        self.assertEqual(record['status'], 'failed')
+        self.assertEqual(record['attempts'], 1)
+        self.assertFalse(Project.objects.get(id=project.id).is_deleting)
+        self.assertTrue(Issue.objects.filter(project=project).exists())
+
+    def test_job_status_is_hidden_from_other_users(self):
+        owned = enqueue('tests.add', owner_id=self.other.id, a=1, b=1)
+        foreign = enqueue('tests.add', owner_id=self.admin.id, a=1, b=1)
+        token = generate_tokens(self.other)['access_token']
+
+        response = self.client.get(f'/api/jobs/{owned}/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/jobs/{foreign}/', HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,32 @@
+from django.views.decorators.csrf import csrf_exempt
+from .backends import get_job
+from ..utils import format_response, require_token
+
+
+@csrf_exempt
+@require_token()
+def job_status(request, job_id):
+    """
+    Status, attempts, progress and result of a background job. Only the user
+    who queued the job and admins can read it.
+    """
+    if request.method != 'GET':
+        return format_response(
+            message="Error : Method not allowed",
+            data=[],
+            http_status=405
+        )
+
+    job = get_job(job_id)
+    # Other users' jobs look missing rather than forbidden
+    if job is None or (job['owner_id'] != request.user.id and request.user.role != 'Admin'):
+        return format_response(
+            message="Error : Job not found",
+            data=[],
+            http_status=404
+        )
+    return format_response(
+        message="Job retrieved successfully",
+        data=job,
+        http_status=200
+    )
@@ -0,0 +1,123 @@
+"""
+Job worker loop, run by `manage.py run_worker`.
+
+Jobs run inline one at a time, except cpu_bound jobs when the worker has a
+process pool (--processes N): those are submitted to the pool, up to N at a
+time, while the loop keeps serving inline jobs.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from .backends import format_job_error, get_backend, retry_delay
+from .registry import NonRetryableJobError, autodiscover, get_job_spec, run_job
+
+
+def _init_pool_process():
+    django.setup()
+
+
+class Worker:
+    def __init__(self, processes=0, log=print):
+        self.backend = get_backend()
+        self.log = log
+        self.pool = None
+        self.pool_size = processes
+        self.in_flight = {}  # future -> (job_id, name, attempts, max_retries)
+
+    def start(self):
+        autodiscover()
+        if self.pool_size:
+            # Children must open their own database connections, not inherit ours
+            connections.close_all()
+            self.pool = ProcessPoolExecutor(max_workers=self.pool_size, initializer=_init_pool_process)
+
+    def stop(self):
+        if self.pool:
+            self.pool.shutdown(wait=True)
+            self._collect(block=False)
+
+    def run_once(self):
+        """Reserve and run at most one job. Returns True if there was work to do."""
+        self._collect(block=False)
+        self.backend.requeue_due()
+        if self.pool and len(self.in_flight) >= self.pool_size:
+            self._collect(block=True)
+
+        reserved = self.backend.reserve()
+        if reserved is None:
+            return False
+        job_id, name, kwargs, attempts, max_retries = reserved
+
+        if attempts > max_retries + 1:
+            # Handed out again after visibility timeouts more often than retries allow
+            self.backend.fail(job_id, "Error: Job exceeded its visibility timeout")
+            self.log(f"Job {job_id} ({name}) failed: visibility timeout exceeded")
+            return True
+
+        if self.pool and get_job_spec(name).cpu_bound:
+            future = self.pool.submit(run_job, job_id, name, kwargs)
+            self.in_flight[future] = (job_id, name, attempts, max_retries)
+            return True
+
+        try:
+            result = run_job(job_id, name, kwargs)
+        except Exception as exc:
+            self._failed(job_id, name, attempts, max_retries, exc)
+        else:
+            self._completed(job_id, name, result)
+        finally:
+            close_old_connections()
+        return True
+
+    def run_forever(self):
+        self.start()
+        try:
+            while True:
+                if not self.run_once():
+                    time.sleep(settings.JOBS['POLL_INTERVAL'])
+        finally:
+            self.stop()
+
+    def drain(self):
+        """Run jobs until the queue is empty."""
+        self.start()
+        try:
+            while True:
+                if self.run_once():
+                    continue
+                if not self.in_flight:
+                    break
+                self._collect(block=True)
+        finally:
+            self.stop()
+
+    def _collect(self, block):
+        """Record finished pool jobs; with block=True wait for at least one."""
+        if not self.in_flight:
+            return
+        done, _pending = wait(self.in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            job_id, name, attempts, max_retries = self.in_flight.pop(future)
+            try:
+                result = future.result()
+            except Exception as exc:
+                self._failed(job_id, name, attempts, max_retries, exc)
+            else:
+                self._completed(job_id, name, result)
+
+    def _completed(self, job_id, name, result):
+        self.backend.complete(job_id, result)
+        self.log(f"Job {job_id} ({name}) completed")
+
+    def _failed(self, job_id, name, attempts, max_retries, exc):
+        error = format_job_error(exc)
+        if isinstance(exc, NonRetryableJobError) or attempts > max_retries:
+            self.backend.fail(job_id, error)
+            self.log(f"Job {job_id} ({name}) failed: {error}")
+        else:
+            self.backend.fail(job_id, error, retry_at=time.time() + retry_delay(attempts))
+            self.log(f"Job {job_id} ({name}) attempt {attempts} failed, retrying: {error}")
@@ -0,0 +1,333 @@
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from apps.auth.otp_delivery import get_backend as get_otp_backend
+from apps.features.models import Feature, ProjectFeature
+from apps.issues.models import Issue
+from apps.monitoring.metrics import REGISTRY, quantile
+from apps.projects.models import Project
+from apps.users.models import CustomUser
+from apps.utils import REDIS_CLIENT
+
+BENCH_USERNAME = 'bench-admin'
+BENCH_PASSWORD = 'bench-password-123'
+QUERY_INSPECTOR_MIDDLEWARE = 'apps.monitoring.queries.QueryInspectorMiddleware'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and benchmark the hot API endpoints "
+        "(login, verify_otp, list_issues, create_issue, update_issue, list_features_denormalized). "
+        "Writes throughput, latency percentiles and queries per request to a JSON file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument('--features', type=int, default=100)
+        parser.add_argument('--features-per-project', type=int, default=10)
+        parser.add_argument('--issues', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--login-iterations', type=int, default=20,
+                            help="login/verify_otp rounds (password hashing makes these slow).")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per endpoint.")
+        parser.add_argument('--client', choices=['wsgi', 'asgi'], default='wsgi',
+                            help="Drive requests through the WSGI test client or the ASGI handler.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Concurrent requests (asgi client only).")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='bench_results.json')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] > 1 and options['client'] != 'asgi':
+            raise CommandError("--concurrency requires --client asgi")
+        if min(options['iterations'], options['login_iterations'], options['projects']) < 1:
+            raise CommandError("--iterations, --login-iterations and --projects must be at least 1")
+
+        self.rng = random.Random(options['seed'])
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            volumes = self.seed(options)
+            scenarios = self.scenarios()
+            REGISTRY.reset()
+            # Measure the endpoints, not the API rate limits or the query inspector; keep
+            # benchmark OTPs in process instead of on the live delivery queue
+            with override_settings(
+                RATE_LIMITS={},
+                MIDDLEWARE=[name for name in settings.MIDDLEWARE if name != QUERY_INSPECTOR_MIDDLEWARE],
+                OTP_DELIVERY={**settings.OTP_DELIVERY, 'BACKEND': 'apps.auth.otp_delivery.InProcessBackend'},
+            ):
+                get_otp_backend.cache_clear()
+                try:
+                    if options['client'] == 'asgi':
+                        results = asyncio.run(self.run_async(options, scenarios))
+                    else:
+                        results = self.run_sync(options, scenarios)
+                finally:
+                    get_otp_backend.cache_clear()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'timestamp': int(time.time()),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'client': options['client'],
+                'concurrency': options['concurrency'],
+                'iterations': options['iterations'],
+                'volumes': volumes,
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:28} {result['throughput_rps']:9.1f} req/s  "
+                f"p50 {result['latency_ms']['p50']:8.2f}ms  p95 {result['latency_ms']['p95']:8.2f}ms  "
+                f"p99 {result['latency_ms']['p99']:8.2f}ms  {result['queries_per_request']:6.1f} q/req"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    # Seeding
+
+    def seed(self, options):
+        rng = self.rng
+        projects = Project.objects.bulk_create(
+            Project(name=f'bench-project-{i}', slug=f'bench-project-{i}', description='Benchmark project')
+            for i in range(options['projects'])
+        )
+        features = Feature.objects.bulk_create(
+            Feature(name=f'bench-feature-{i}', description='Benchmark feature')
+            for i in range(options['features'])
+        )
+        per_project = min(options['features_per_project'], len(features))
+        ProjectFeature.objects.bulk_create(
+            ProjectFeature(project=project, feature=feature)
+            for project in projects
+            for feature in rng.sample(features, per_project)
+        )
+        links_by_project = {}
+        for link in ProjectFeature.objects.only('id', 'project_id'):
+            links_by_project.setdefault(link.project_id, []).append(link.id)
+
+        statuses = [value for value, _ in Issue.Status.choices]
+        priorities = [value for value, _ in Issue.Priority.choices]
+        issues = []
+        for i in range(options['issues']):
+            project = rng.choice(projects)
+            links = links_by_project.get(project.id)
+            issues.append(Issue(
+                title=f'Benchmark issue {i}',
+                project=project,
+                project_feature_id=rng.choice(links) if links and rng.random() < 0.7 else None,
+                priority=rng.choice(priorities),
+                status=rng.choice(statuses),
+                description='Lorem ipsum ' * rng.randint(5, 60),
+            ))
+        Issue.objects.bulk_create(issues, batch_size=1000)
+
+        # One hash for all seeded users keeps seeding fast; only the bench admin logs in.
+        password_hash = make_password(BENCH_PASSWORD)
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f'bench-user-{i}', email=f'bench-user-{i}@example.com', password=password_hash)
+            for i in range(options['users'])
+        )
+        admin = CustomUser.objects.create(username=BENCH_USERNAME, email='bench-admin@example.com',
+                                          password=password_hash)
+        groups = list(Group.objects.all())
+        admin.groups.add(Group.objects.get(name='Admin'))
+        if groups:
+            Membership = CustomUser.groups.through
+            Membership.objects.bulk_create(
+                Membership(customuser_id=user.id, group_id=rng.choice(groups).id) for user in users
+            )
+
+        return {
+            'projects': len(projects),
+            'features': len(features),
+            'project_features': sum(len(links) for links in links_by_project.values()),
+            'issues': len(issues),
+            'users': len(users) + 1,
+        }
+
+    # Scenarios
+
+    def scenarios(self):
+        """(name, url_name, request factory) tuples; factories return (method, path, payload)."""
+        rng = self.rng
+        issue_ids = list(Issue.objects.values_list('id', flat=True))
+        project_ids = list(Project.objects.values_list('id', flat=True))
+        statuses = [value for value, _ in Issue.Status.choices]
+
+        def create_issue():
+            return 'post', '/api/issues/create/', {
+                'title': 'Benchmark created issue',
+                'project': rng.choice(project_ids),
+                'description': 'Created by run_benchmark',
+            }
+
+        def update_issue():
+            return 'post', f'/api/issues/{rng.choice(issue_ids)}/update/', {'status': rng.choice(statuses)}
+
+        return [
+            ('list_issues', 'list_issues', lambda: ('get', '/api/issues/list/', None)),
+            ('create_issue', 'create_issue', create_issue),
+            ('update_issue', 'update_issue', update_issue),
+            ('list_features_denormalized', 'list_features_with_project_info',
+             lambda: ('get', '/api/features/projects-feature/', None)),
+        ]
+
+    def run_sync(self, options, scenarios):
+        client = Client()
+        results = {}
+
+        login_latencies, verify_latencies, access_token = [], [], None
+        for _ in range(options['login_iterations']):
+            start = time.perf_counter()
+            response = client.post('/api/auth/login/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD},
+                                   content_type='application/json')
+            login_latencies.append(time.perf_counter() - start)
+            temp_token = self.response_data(response)['temp_token']
+
+            payload = {'temp_token': temp_token, 'otp': self.read_otp(temp_token)}
+            start = time.perf_counter()
+            response = client.post('/api/auth/verify-otp/', payload, content_type='application/json')
+            verify_latencies.append(time.perf_counter() - start)
+            access_token = self.response_data(response)['access_token']
+        results['login'] = self.summarise('login', login_latencies, sum(login_latencies))
+        results['verify_otp'] = self.summarise('verify_otp', verify_latencies, sum(verify_latencies))
+
+        headers = {'Authorization': f'Bearer {access_token}'}
+        for name, url_name, factory in scenarios:
+            for _ in range(options['warmup']):
+                self.check_response(name, self.send(client, factory, headers))
+            before = REGISTRY.totals(url_name)
+            latencies = []
+            wall_start = time.perf_counter()
+            for _ in range(options['iterations']):
+                start = time.perf_counter()
+                response = self.send(client, factory, headers)
+                latencies.append(time.perf_counter() - start)
+                self.check_response(name, response)
+            wall = time.perf_counter() - wall_start
+            results[name] = self.summarise(url_name, latencies, wall, before)
+        return results
+
+    async def run_async(self, options, scenarios):
+        client = AsyncClient()
+        results = {}
+
+        login_latencies, verify_latencies, access_token = [], [], None
+        for _ in range(options['login_iterations']):
+            start = time.perf_counter()
+            response = await client.post('/api/auth/login/',
+                                         {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD},
+                                         content_type='application/json')
+            login_latencies.append(time.perf_counter() - start)
+            temp_token = self.response_data(response)['temp_token']
+
+            payload = {'temp_token': temp_token, 'otp': self.read_otp(temp_token)}
+            start = time.perf_counter()
+            response = await client.post('/api/auth/verify-otp/', payload, content_type='application/json')
+            verify_latencies.append(time.perf_counter() - start)
+            access_token = self.response_data(response)['access_token']
+        results['login'] = self.summarise('login', login_latencies, sum(login_latencies))
+        results['verify_otp'] = self.summarise('verify_otp', verify_latencies, sum(verify_latencies))
+
+        headers = {'Authorization': f'Bearer {access_token}'}
+        concurrency = options['concurrency']
+        for name, url_name, factory in scenarios:
+            for _ in range(options['warmup']):
+                self.check_response(name, await self.send_async(client, factory, headers))
+            before = REGISTRY.totals(url_name)
+            latencies = []
+
+            async def worker(count):
+                for _ in range(count):
+                    start = time.perf_counter()
+                    response = await self.send_async(client, factory, headers)
+                    latencies.append(time.perf_counter() - start)
+                    self.check_response(name, response)
+
+            share, remainder = divmod(options['iterations'], concurrency)
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(worker(share + (i < remainder)) for i in range(concurrency)))
+            wall = time.perf_counter() - wall_start
+            results[name] = self.summarise(url_name, latencies, wall, before)
+        return results
+
+    # Helpers
+
+    def send(self, client, factory, headers):
+        method, path, payload = factory()
+        if method == 'get':
+            return client.get(path, headers=headers)
+        return client.post(path, payload, content_type='application/json', headers=headers)
+
+    async def send_async(self, client, factory, headers):
+        method, path, payload = factory()
+        if method == 'get':
+            return await client.get(path, headers=headers)
+        return await client.post(path, payload, content_type='application/json', headers=headers)
+
+    def response_data(self, response):
+        body = response.json()
+        if response.status_code >= 400:
+            raise CommandError(f"Benchmark request failed ({response.status_code}): {body['message']}")
+        return body['data']
+
+    def check_response(self, name, response):
+        """Abort the run on a failed request: its timing would not measure the endpoint."""
+        if not 200 <= response.status_code < 300:
+            raise CommandError(
+                f"{name} request failed ({response.status_code}): {response.content.decode()[:200]}"
+            )
+
+    def read_otp(self, temp_token):
+        """Read the OTP the login view stored, standing in for the user's inbox."""
+        return REDIS_CLIENT.hget(f"otp_{temp_token}", 'otp').decode()
+
+    def summarise(self, url_name, latencies, wall, before=None):
+        after = REGISTRY.totals(url_name)
+        before = before or {'count': 0, 'db_queries': 0}
+        requests = after['count'] - before['count'] or len(latencies)
+        ordered = sorted(latencies)
+        return {
+            'requests': len(latencies),
+            'throughput_rps': len(latencies) / wall if wall else 0.0,
+            'latency_ms': {
+                'mean': 1000 * sum(ordered) / len(ordered),
+                'p50': 1000 * quantile(ordered, 0.5),
+                'p95': 1000 * quantile(ordered, 0.95),
+                'p99': 1000 * quantile(ordered, 0.99),
+                'max': 1000 * ordered[-1],
+            },
+            'queries_per_request': (after['db_queries'] - before['db_queries']) / requests,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,177 @@
+"""
+Per-request performance counters and per-process aggregates.
+
+PerformanceMiddleware opens a RequestMetrics scope for every request; the DB
+execute wrapper and the instrumented Redis client record into whichever scope
+is active. Finished requests are folded into REGISTRY, which renders the
+Prometheus text exposition served by the internal metrics endpoint.
+Aggregates are per process: scrape every worker.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters collected while serving a single request."""
+
+    __slots__ = ('db_queries', 'db_time', 'redis_calls', 'redis_time')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.redis_calls = 0
+        self.redis_time = 0.0
+
+    def db_execute_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook timing every SQL statement."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def activate(metrics):
+    """Make `metrics` the active scope. Returns a token for deactivate()."""
+    return _current_metrics.set(metrics)
+
+
+def deactivate(token):
+    _current_metrics.reset(token)
+
+
+def record_redis_call(duration):
+    """Count one Redis round-trip against the active request, if any."""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.redis_calls += 1
+        metrics.redis_time += duration
+
+
+class _ViewStats:
+    __slots__ = ('durations', 'count', 'duration_sum', 'db_queries', 'db_time',
+                 'redis_calls', 'redis_time', 'response_bytes', 'errors')
+
+    def __init__(self, window):
+        self.durations = deque(maxlen=window)
+        self.count = 0
+        self.duration_sum = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.redis_calls = 0
+        self.redis_time = 0.0
+        self.response_bytes = 0
+        self.errors = 0
+
+
+def quantile(sorted_values, q):
+    """Nearest-rank quantile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class MetricsRegistry:
+    """
+    Thread-safe aggregates keyed by URL name. Quantiles are computed over a
+    sliding window of the most recent `window` requests per URL name; totals
+    are cumulative for the life of the process.
+    """
+
+    def __init__(self, window):
+        self._window = window
+        self._lock = threading.Lock()
+        self._views = defaultdict(lambda: _ViewStats(self._window))
+        self._rate_limits = defaultdict(int)
+
+    def observe(self, view_name, duration, metrics, response_bytes, status_code):
+        with self._lock:
+            stats = self._views[view_name]
+            stats.durations.append(duration)
+            stats.count += 1
+            stats.duration_sum += duration
+            stats.db_queries += metrics.db_queries
+            stats.db_time += metrics.db_time
+            stats.redis_calls += metrics.redis_calls
+            stats.redis_time += metrics.redis_time
+            stats.response_bytes += response_bytes
+            if status_code >= 500:
+                stats.errors += 1
+
+    def record_rate_limit(self, view_name, decision):
+        """Count one rate limiter decision ('allowed', 'limited' or 'limited_local')."""
+        with self._lock:
+            self._rate_limits[view_name, decision] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._rate_limits.clear()
+
+    def totals(self, view_name):
+        """Cumulative counters recorded so far for one URL name."""
+        with self._lock:
+            stats = self._views.get(view_name)
+            if stats is None:
+                return {'count': 0, 'db_queries': 0, 'db_time': 0.0, 'redis_calls': 0, 'redis_time': 0.0}
+            return {
+                'count': stats.count,
+                'db_queries': stats.db_queries,
+                'db_time': stats.db_time,
+                'redis_calls': stats.redis_calls,
+                'redis_time': stats.redis_time,
+            }
+
+    def render_prometheus(self):
+        """Render all aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            snapshot = {
+                name: (sorted(stats.durations), stats.count, stats.duration_sum, stats.db_queries,
+                       stats.db_time, stats.redis_calls, stats.redis_time, stats.response_bytes,
+                       stats.errors)
+                for name, stats in self._views.items()
+            }
+            rate_limits = dict(self._rate_limits)
+
+        lines = [
+            '# HELP api_request_duration_seconds Wall time per request by URL name.',
+            '# TYPE api_request_duration_seconds summary',
+        ]
+        for name, (durations, count, duration_sum, *_rest) in sorted(snapshot.items()):
+            for q in QUANTILES:
+                value = quantile(durations, q) if durations else 0.0
+                lines.append(f'api_request_duration_seconds{{view="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'api_request_duration_seconds_sum{{view="{name}"}} {duration_sum:.6f}')
+            lines.append(f'api_request_duration_seconds_count{{view="{name}"}} {count}')
+
+        counters = (
+            ('api_db_queries_total', 'SQL statements executed.', 3, '{}'),
+            ('api_db_seconds_total', 'Time spent executing SQL.', 4, '{:.6f}'),
+            ('api_redis_calls_total', 'Redis round-trips.', 5, '{}'),
+            ('api_redis_seconds_total', 'Time spent in Redis round-trips.', 6, '{:.6f}'),
+            ('api_response_bytes_total', 'Serialised response bytes.', 7, '{}'),
+            ('api_server_errors_total', 'Responses with a 5xx status.', 8, '{}'),
+        )
+        for metric, help_text, index, fmt in counters:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for name, values in sorted(snapshot.items()):
+                lines.append(f'{metric}{{view="{name}"}} {fmt.format(values[index])}')
+
+        lines.append('# HELP api_rate_limit_decisions_total Rate limiter decisions (limited_local: refused without Redis).')
+        lines.append('# TYPE api_rate_limit_decisions_total counter')
+        for (name, decision), count in sorted(rate_limits.items()):
+            lines.append(f'api_rate_limit_decisions_total{{view="{name}",decision="{decision}"}} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry(window=getattr(settings, 'PERFORMANCE_METRICS_WINDOW', 1024))
@@ -0,0 +1,36 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics
+
+
+class PerformanceMiddleware:
+    """
+    Record wall time, SQL count/time, Redis count/time and response size for
+    every request, aggregated per URL name in metrics.REGISTRY.
+    Keep it first in MIDDLEWARE so the timings cover the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics.activate(request_metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_metrics.db_execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate(token)
+        duration = time.perf_counter() - start
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = (resolver_match.url_name if resolver_match else None) or 'unresolved'
+        response_bytes = 0 if response.streaming else len(response.content)
+        metrics.REGISTRY.observe(view_name, duration, request_metrics, response_bytes, response.status_code)
+        return response
@@ -0,0 +1,133 @@
+"""
+Slow-query and N+1 detection.
+
+QueryInspector fingerprints every SQL statement executed inside its scope
+(literals and IN-lists collapsed), then reports fingerprints repeated more
+than REPEAT_THRESHOLD times and statements slower than SLOW_QUERY_MS, each
+with the project source line that issued it. In strict mode a report raises
+QueryBudgetExceeded, which fails the request in development and the test in CI:
+
+    with inspect_queries(strict=True):
+        self.client.get('/api/issues/list/')
+"""
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE_RE = re.compile(r'\s+')
+
+_MONITORING_DIR = str(Path(__file__).resolve().parent)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when repeated or slow queries are detected."""
+
+
+def fingerprint(sql):
+    """Normalise SQL so statements differing only in parameters compare equal."""
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _origin():
+    """Innermost stack frame that belongs to the project (not Django or the instrumentation)."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (filename.startswith(base_dir) and not filename.startswith(_MONITORING_DIR)
+                and 'site-packages' not in filename):
+            return f"{Path(filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+def _setting(name):
+    return settings.QUERY_INSPECTOR[name]
+
+
+class QueryInspector:
+    """connection.execute_wrapper hook collecting fingerprints, timings and origins."""
+
+    def __init__(self, label='', strict=None, repeat_threshold=None, slow_query_ms=None):
+        self.label = label
+        self.strict = _setting('STRICT') if strict is None else strict
+        self.repeat_threshold = _setting('REPEAT_THRESHOLD') if repeat_threshold is None else repeat_threshold
+        self.slow_query_ms = _setting('SLOW_QUERY_MS') if slow_query_ms is None else slow_query_ms
+        self.counts = {}
+        self.origins = {}
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            key = fingerprint(sql)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            # Walking the stack is the expensive part; do it once per fingerprint.
+            if key not in self.origins:
+                self.origins[key] = _origin()
+            if elapsed_ms > self.slow_query_ms:
+                self.slow_queries.append((elapsed_ms, key, _origin()))
+
+    def problems(self):
+        """Human-readable descriptions of every violation found so far."""
+        found = [
+            f"{count}x repeated query at {self.origins[key]}: {key}"
+            for key, count in self.counts.items()
+            if count > self.repeat_threshold
+        ]
+        found.extend(
+            f"slow query ({elapsed_ms:.1f}ms > {self.slow_query_ms}ms) at {origin}: {key}"
+            for elapsed_ms, key, origin in self.slow_queries
+        )
+        return found
+
+    def report(self):
+        """Log violations; raise QueryBudgetExceeded in strict mode."""
+        problems = self.problems()
+        if not problems:
+            return
+        for problem in problems:
+            logger.warning("%s %s", self.label, problem)
+        if self.strict:
+            raise QueryBudgetExceeded(f"{self.label} " + '; '.join(problems))
+
+
+@contextmanager
+def inspect_queries(label='', **options):
+    """Inspect every query executed in the block on all database connections."""
+    inspector = QueryInspector(label=label, **options)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(inspector))
+        yield inspector
+    inspector.report()
+
+
+class QueryInspectorMiddleware:
+    """Run every request under inspect_queries when QUERY_INSPECTOR['ENABLED'] is set."""
+
+    def __init__(self, get_response):
+        if not _setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inspect_queries(label=f"[{request.method} {request.path}]"):
+            response = self.get_response(request)
+        return response
@@ -0,0 +1,37 @@
+"""
+Redis client classes that report round-trips to the active request metrics.
+Enabled through CACHES['default']['OPTIONS']['REDIS_CLIENT_CLASS'], so both
+django.core.cache and apps.utils.REDIS_CLIENT are covered.
+"""
+import time
+
+import redis
+from redis.client import Pipeline
+
+from .metrics import record_redis_call
+
+
+class InstrumentedPipeline(Pipeline):
+    """A pipeline counts as a single round-trip when executed."""
+
+    def execute(self, raise_on_error=True):
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            record_redis_call(time.perf_counter() - start)
+
+
+class InstrumentedRedis(redis.Redis):
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            record_redis_call(time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
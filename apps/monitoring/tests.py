@@ -0,0 +1,26 @@
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase, TestCase
+
+from .queries import QueryBudgetExceeded, fingerprint, inspect_queries
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s)  AND name = 'y' LIMIT 5"),
+        )
+
+
+class InspectQueriesTests(TestCase):
+    def test_strict_mode_raises_on_repeated_queries(self):
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('apps.monitoring.queries', 'WARNING'):
+            with inspect_queries(strict=True, repeat_threshold=2):
+                for index in range(3):
+                    Group.objects.filter(id=index).exists()
+
+    def test_queries_under_the_threshold_pass(self):
+        with inspect_queries(strict=True, repeat_threshold=2) as inspector:
+            for index in range(2):
+                Group.objects.filter(id=index).exists()
+        self.assertEqual(inspector.problems(), [])
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from .metrics import REGISTRY
+from ..utils import format_response
+
+
+@require_GET
+def metrics(request):
+    """Expose per-URL performance aggregates in Prometheus text format (internal only)."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return format_response(
+            message="Error : Access restricted",
+            data=[],
+            http_status=403
+        )
+
+    return HttpResponse(
+        REGISTRY.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
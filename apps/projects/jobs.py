@@ -0,0 +1,60 @@
+"""
+Background deletion of projects.
+
+Deleting a project inline makes Django's collector load every related issue
+into memory before the first DELETE. Instead delete_project checks the
+RESTRICT relation with an exists() query, flags the project as deleting and
+enqueues this job. The job re-checks the RESTRICT relation under a row lock
+before touching anything, then removes the project's issues in batched raw
+deletes (no collector, no per-row signals) and finally the project row itself.
+Once issues have been deleted the project stays hidden, even if the job fails.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from apps.features.models import ProjectFeature
+from apps.issues.models import Issue
+from apps.jobs.registry import NonRetryableJobError, job, set_progress
+from apps.projects.models import Project
+
+
+def _lock_project(project_id):
+    """Lock the project row for the current transaction. Returns False if it is gone."""
+    return Project.objects.select_for_update().filter(id=project_id).values_list('id', flat=True).first() is not None
+
+
+@job('projects.delete_project')
+def delete_project(project_id):
+    """Delete a project and its issues. Returns the number of issues deleted."""
+    batch_size = settings.PROJECT_DELETION['BATCH_SIZE']
+
+    with transaction.atomic():
+        # Lock the row so the check and the flag are consistent with concurrent writers
+        if not _lock_project(project_id):
+            # Already deleted by an earlier attempt
+            return {'deleted_issues': 0}
+        has_features = ProjectFeature.objects.filter(project_id=project_id).exists()
+        # Nothing has been deleted yet, so a blocked project can be shown again.
+        # Retries start here too: otherwise keep it hidden while it is being emptied
+        Project.objects.filter(id=project_id).update(is_deleting=not has_features)
+    if has_features:
+        raise NonRetryableJobError("Project has associated features")
+
+    deleted = 0
+    while True:
+        issue_ids = list(Issue.objects.filter(project_id=project_id).values_list('id', flat=True)[:batch_size])
+        if not issue_ids:
+            break
+        # Nothing references Issue, so the collector can be skipped safely
+        deleted += Issue.objects.filter(id__in=issue_ids)._raw_delete(Issue.objects.db)
+        set_progress(deleted_issues=deleted)
+
+    with transaction.atomic():
+        _lock_project(project_id)
+        # An association added since the check (new ones are refused while the project
+        # is flagged) blocks the RESTRICT delete; the emptied project stays hidden
+        if ProjectFeature.objects.filter(project_id=project_id).exists():
+            raise NonRetryableJobError("Project gained associated features while its issues were being deleted")
+        Project.objects.filter(id=project_id).delete()
+
+    return {'deleted_issues': deleted}
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='is_deleting',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
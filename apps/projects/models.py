@@ -1,7 +1,8 @@
 from django.db import models
+from apps.versioning import VersionedModel
 from django.utils.text import slugify
 
-class Project(models.Model):
+class Project(VersionedModel):
     class ProjectStatus(models.TextChoices):
         PLANNING = 'planning', 'Planning'
         ACTIVE = 'active', 'Active Development'
@@ -35,6 +36,10 @@ class Project(models.Model):
         default=PriorityLevel.MEDIUM
     )
     
+    # Set while a background deletion job is removing the project's issues;
+    # such projects are hidden from the API and accept no new issues
+    is_deleting = models.BooleanField(default=False, db_index=True)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -1,8 +1,15 @@
 from django.views.decorators.csrf import csrf_exempt
 import json
+from django.db.models import Count, Q
 from apps.projects.models import Project
+from apps.features.models import ProjectFeature
+from apps.features.matrix import invalidate_feature_matrix
+from apps.issues.models import Issue
 from apps.users.models import CustomUser
-from ..utils import format_response, validate_request_payload,require_token
+from apps.jobs.backends import enqueue
+from apps.versioning import VersionConflict
+from .jobs import delete_project as delete_project_job
+from ..utils import format_response, validate_request_payload,require_token, require_permission, coalesce_requests, requested_includes, expected_version, apply_changes
 
 @csrf_exempt
 def create_project(request):
@@ -105,8 +112,9 @@ def create_project(request):
 
 @csrf_exempt
 @require_token('Admin')
+@coalesce_requests
 def list_projects(request):
-    """List all projects (accessible to PMs/admins)."""
+    """List all projects (accessible to PMs/admins). ?include=counts adds issue counts."""
     if request.method != 'GET':
         return format_response(
             message="Error : Method not allowed",
@@ -122,9 +130,17 @@ def list_projects(request):
         #         http_status=403
         #     )
 
-        projects = Project.objects.all()
-        project_list = [
-            {
+        include_counts = 'counts' in requested_includes(request)
+        projects = Project.objects.filter(is_deleting=False)
+        if include_counts:
+            projects = projects.annotate(
+                issue_count=Count('issues'),
+                open_issue_count=Count('issues', filter=Q(issues__status__in=Issue.OPEN_STATUSES)),
+            )
+
+        project_list = []
+        for project in projects:
+            project_data = {
                 'id': project.id,
                 'name': project.name,
                 'slug': project.slug,
@@ -135,8 +151,11 @@ def list_projects(request):
                 'priority': project.get_priority_display(),
                 'created_at': project.created_at.isoformat(),
                 'updated_at': project.updated_at.isoformat(),
-            } for project in projects
-        ]
+            }
+            if include_counts:
+                project_data['issue_count'] = project.issue_count
+                project_data['open_issue_count'] = project.open_issue_count
+            project_list.append(project_data)
         return format_response(
             message="Projects retrieved successfully",
             data=project_list,
@@ -161,7 +180,7 @@ def get_project(request, project_id):
         )
 
     try:
-        project = Project.objects.get(id=project_id)
+        project = Project.objects.get(id=project_id, is_deleting=False)
         # if not request.user.is_staff and (not project.manager or project.manager != request.user):
         #     return format_response(
         #         message="Error : Unauthorized access",
@@ -180,12 +199,15 @@ def get_project(request, project_id):
             'priority': project.get_priority_display(),
             'created_at': project.created_at.isoformat(),
             'updated_at': project.updated_at.isoformat(),
+            'version': project.version,
         }
-        return format_response(
+        response = format_response(
             message="Project retrieved successfully",
             data=project_data,
             http_status=200
         )
+        response['ETag'] = f'"{project.version}"'
+        return response
     except Project.DoesNotExist:
         return format_response(
             message="Error : Project not found",
@@ -196,7 +218,11 @@ def get_project(request, project_id):
 @csrf_exempt
 # @require_token
 def update_project(request, project_id):
-    """Update a project (accessible to PMs/admins)."""
+    """
+    Update a project (accessible to PMs/admins). Send the version being edited
+    as If-Match (the ETag of get_project) or a 'version' key; a stale version
+    gets 409.
+    """
     if request.method != 'POST':  # Using POST as per your preference for updates
         return format_response(
             message="Error : Method not allowed",
@@ -205,7 +231,7 @@ def update_project(request, project_id):
         )
 
     try:
-        project = Project.objects.get(id=project_id)
+        project = Project.objects.get(id=project_id, is_deleting=False)
         # Remove manager authentication check since manager field is gone
         # if not request.user.is_staff:
         #     return format_response(
@@ -215,12 +241,13 @@ def update_project(request, project_id):
         #     )
 
         data = json.loads(request.body)
-        allowed_keys = {'name', 'description', 'status', 'priority'}
+        allowed_keys = {'name', 'description', 'status', 'priority', 'version'}
         key_types = {
             'name': str, 
             'description': str, 
             'status': str, 
-            'priority': str
+            'priority': str,
+            'version': int
         }
         is_valid, error_message = validate_request_payload(data, [], allowed_keys, key_types)
         if not is_valid:
@@ -230,6 +257,14 @@ def update_project(request, project_id):
                 http_status=400
             )
 
+        version, error_message = expected_version(request, data, project)
+        if error_message:
+            return format_response(
+                message=error_message,
+                data=[],
+                http_status=400
+            )
+
         # Validate status and priority values if provided
         if 'status' in data and data['status'] not in dict(Project.ProjectStatus.choices):
             return format_response(
@@ -246,10 +281,15 @@ def update_project(request, project_id):
             )
 
         # Update the fields
-        for key, value in data.items():
-            if key in allowed_keys:
-                setattr(project, key, value)
-        project.save()
+        changed = apply_changes(project, data, ['name', 'description', 'status', 'priority'])
+        try:
+            project.save_versioned(changed, version)
+        except VersionConflict:
+            return format_response(
+                message="Error : Project was modified by another request, reload it and retry",
+                data=[],
+                http_status=409
+            )
 
         # Match create_project response fields exactly
         project_data = {
@@ -259,12 +299,15 @@ def update_project(request, project_id):
             'description': project.description,
             'created_at': project.created_at.isoformat(),
             'updated_at': project.updated_at.isoformat(),
+            'version': project.version,
         }
-        return format_response(
+        response = format_response(
             message="Project updated successfully",
             data=project_data,
             http_status=200
         )
+        response['ETag'] = f'"{project.version}"'
+        return response
     except json.JSONDecodeError:
         return format_response(
             message="Error : Invalid JSON",
@@ -279,9 +322,13 @@ def update_project(request, project_id):
         )
 
 @csrf_exempt
-# @require_token
+@require_permission('delete_project')
 def delete_project(request, project_id):
-    """Delete a project (accessible to PMs/admins)."""
+    """
+    Queue a project for deletion (requires the delete_project permission:
+    PMs and admins). Issues are removed by a background job; the caller can
+    poll /api/jobs/<job_id>/ for progress.
+    """
     if request.method != 'POST':
         return format_response(
             message="Error : Method not allowed",
@@ -289,24 +336,35 @@ def delete_project(request, project_id):
             http_status=405
         )
 
-    try:
-        project = Project.objects.get(id=project_id)
-        # if not request.user.is_staff and (not project.manager or project.manager != request.user):
-        #     return format_response(
-        #         message="Error : Unauthorized access",
-        #         data=[],
-        #         http_status=403
-        #     )
+    # if not request.user.is_staff and (not project.manager or project.manager != request.user):
+    #     return format_response(
+    #         message="Error : Unauthorized access",
+    #         data=[],
+    #         http_status=403
+    #     )
 
-        project.delete()
+    # ProjectFeature.project is RESTRICT: fail fast instead of after deleting issues
+    if ProjectFeature.objects.filter(project_id=project_id).exists():
         return format_response(
-            message="Project deleted successfully",
+            message="Error : Project has associated features, remove them before deleting the project",
             data=[],
-            http_status=200
+            http_status=400
         )
-    except Project.DoesNotExist:
+
+    # Conditional update so concurrent requests queue at most one job
+    if not Project.objects.filter(id=project_id, is_deleting=False).update(is_deleting=True):
         return format_response(
             message="Error : Project not found",
             data=[],
             http_status=404
-        )
\ No newline at end of file
+        )
+
+    # The flag is set with update(), which sends no signal to invalidate the matrix
+    invalidate_feature_matrix()
+
+    job_id = enqueue(delete_project_job.job_name, owner_id=request.user.id, project_id=project_id)
+    return format_response(
+        message="Project deletion queued",
+        data={'job_id': job_id, 'status': 'queued'},
+        http_status=202
+    )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from apps.users.permissions import bootstrap_roles
+
+
+class Command(BaseCommand):
+    help = "Create the default role groups and grant any of their default permissions that are missing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database to bootstrap.")
+
+    def handle(self, *args, **options):
+        added = bootstrap_roles(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(f"Roles bootstrapped, {added} permission grant(s) added"))
@@ -33,5 +33,12 @@ class CustomUser(AbstractUser):
         blank=True,
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # is_active as loaded, so post_save receivers can tell a deactivation
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
+
     def __str__(self):
         return self.username
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Role permissions and their compact token encoding.
+
+Access tokens carry the holder's model permissions as a bitmask ('perms')
+together with the permission version they were compiled at ('pv'), so
+utils.require_permission can authorise a request with a bit test instead of
+querying auth_group_permissions. Changing any group's permissions bumps the
+version in Redis, which makes older tokens fail the check until refreshed.
+"""
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+
+from apps.features.models import Feature, ProjectFeature
+from apps.issues.models import Issue
+from apps.projects.models import Project
+from ..utils import REDIS_CLIENT
+
+ACTIONS = ["add", "view", "change", "delete"]
+
+# Bit positions follow this order. Only ever append: reordering would change
+# the meaning of masks inside tokens that are still valid.
+MANAGED_MODELS = [Project, Feature, ProjectFeature, Issue]
+
+PERMISSION_CODENAMES = [
+    f"{action}_{model._meta.model_name}" for model in MANAGED_MODELS for action in ACTIONS
+]
+PERMISSION_BITS = {codename: 1 << index for index, codename in enumerate(PERMISSION_CODENAMES)}
+
+# Default permissions per role, applied by the post_migrate bootstrap
+ROLE_PERMISSIONS = {
+    "Admin": {
+        Project: ["add", "view", "change", "delete"],
+        Feature: ["add", "view", "change", "delete"],
+        ProjectFeature: ["add", "view", "change", "delete"],
+        Issue: ["add", "view", "change", "delete"],
+    },
+    "Project Manager": {
+        Project: ["add", "view", "change", "delete"],
+        Feature: ["add", "view", "change", "delete"],
+        ProjectFeature: ["add", "view", "change", "delete"],
+        Issue: ["add", "view"],  # PMs can add and view Issues
+    },
+    "Developer": {
+        Project: ["view"],  # can list only
+        Feature: ["add", "view", "change"],  # add + update + list
+        ProjectFeature: ["add", "view", "change"],  # same as features
+        Issue: ["add", "view", "change"],  # add + update + list
+    },
+    "Tester": {
+        Project: ["view"],  # can list only
+        Feature: ["view"],  # can only list features
+        ProjectFeature: ["view"],  # can only list project features
+        Issue: ["add", "view", "change"],  # add + update + list
+    },
+}
+
+PERMISSION_VERSION_KEY = "permissions_version"
+
+# Per-process caches: role -> (version, mask) and (version, fetched_at)
+_role_masks = {}
+_cached_version = (0, 0.0)
+
+
+def compile_permission_mask(codenames):
+    """OR together the bits of the given codenames (unknown codenames are ignored)."""
+    mask = 0
+    for codename in codenames:
+        mask |= PERMISSION_BITS.get(codename, 0)
+    return mask
+
+
+def get_permission_version(max_age=None):
+    """
+    Current permission version. Cached per process for
+    PERMISSION_VERSION_CACHE_SECONDS so permission checks rarely touch Redis.
+    """
+    global _cached_version
+    if max_age is None:
+        max_age = settings.PERMISSION_VERSION_CACHE_SECONDS
+    version, fetched_at = _cached_version
+    now = time.monotonic()
+    if now - fetched_at > max_age:
+        version = int(REDIS_CLIENT.get(PERMISSION_VERSION_KEY) or 0)
+        _cached_version = (version, now)
+    return version
+
+
+def _clear_local_caches():
+    global _cached_version
+    _cached_version = (0, 0.0)
+    _role_masks.clear()
+
+
+def bump_permission_version():
+    """Invalidate the permissions embedded in every outstanding access token."""
+    _clear_local_caches()
+    return REDIS_CLIENT.incr(PERMISSION_VERSION_KEY)
+
+
+def get_role_permission_mask(role):
+    """
+    Return (mask, version) for a role, compiled from the group's permissions in
+    the database once per permission version.
+    """
+    version = get_permission_version(max_age=0)
+    cached = _role_masks.get(role)
+    if cached and cached[0] == version:
+        return cached[1], version
+
+    codenames = Permission.objects.filter(
+        group__name=role, codename__in=PERMISSION_CODENAMES
+    ).values_list('codename', flat=True)
+    mask = compile_permission_mask(codenames)
+    _role_masks[role] = (version, mask)
+    return mask, version
+
+
+def has_permission(mask, codename):
+    return bool(mask & PERMISSION_BITS[codename])
+
+
+def bootstrap_roles(using=DEFAULT_DB_ALIAS):
+    """
+    Make sure every role group exists and holds its default permissions from
+    ROLE_PERMISSIONS. Desired and current grants are diffed in memory and the
+    missing ones inserted in one bulk_create on the through table, so the cost
+    is a handful of queries and re-running it is a no-op. Grants added by hand
+    are left alone. Returns the number of grants added.
+
+    On a fresh database no token can carry its permissions yet, so the
+    permission version is only bumped (a Redis write) when grants existed
+    before.
+    """
+    groups = {group.name: group.id for group in Group.objects.using(using).filter(name__in=ROLE_PERMISSIONS)}
+    missing_groups = [Group(name=name) for name in ROLE_PERMISSIONS if name not in groups]
+    if missing_groups:
+        Group.objects.using(using).bulk_create(missing_groups, ignore_conflicts=True)
+        groups = {group.name: group.id for group in Group.objects.using(using).filter(name__in=ROLE_PERMISSIONS)}
+
+    content_types = ContentType.objects.db_manager(using).get_for_models(*MANAGED_MODELS)
+    permissions = {
+        (content_type_id, codename): permission_id
+        for permission_id, content_type_id, codename in Permission.objects.using(using).filter(
+            content_type__in=content_types.values(), codename__in=PERMISSION_CODENAMES
+        ).values_list('id', 'content_type_id', 'codename')
+    }
+
+    desired = set()
+    for role, models_perms in ROLE_PERMISSIONS.items():
+        for model, actions in models_perms.items():
+            content_type_id = content_types[model].id
+            for action in actions:
+                codename = f"{action}_{model._meta.model_name}"
+                permission_id = permissions.get((content_type_id, codename))
+                if permission_id is None:
+                    print(f"Permission {codename} not found for {model}")
+                    continue
+                desired.add((groups[role], permission_id))
+
+    GroupPermission = Group.permissions.through
+    current = set(GroupPermission.objects.using(using).filter(
+        group_id__in=groups.values(), permission_id__in=permissions.values()
+    ).values_list('group_id', 'permission_id'))
+
+    to_add = desired - current
+    if to_add:
+        GroupPermission.objects.using(using).bulk_create(
+            [GroupPermission(group_id=group_id, permission_id=permission_id) for group_id, permission_id in to_add],
+            ignore_conflicts=True,
+        )
+        # bulk_create sends no m2m_changed, so bump the version once here
+        if current:
+            bump_permission_version()
+        else:
+            _clear_local_caches()
+    return len(to_add)
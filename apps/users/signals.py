@@ -1,12 +1,18 @@
 # apps/users/signals.py
 
-from django.db.models.signals import post_migrate
-from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.apps import apps
+from django.contrib.auth.models import Group
 from django.dispatch import receiver
-from apps.projects.models import Project
-from apps.features.models import Feature, ProjectFeature
-from apps.issues.models import Issue
+from redis.exceptions import RedisError
+from .models import CustomUser
+from .permissions import bootstrap_roles, bump_permission_version
+from ..utils import invalidate_cached_user, revoke_user_refresh_families, revoke_user_tokens
+
+
+# Apps whose models ROLE_PERMISSIONS covers; the bootstrap waits for the last of them
+BOOTSTRAP_APPS = ["apps.users", "apps.projects", "apps.features", "apps.issues"]
 
 
 @receiver(post_migrate)
@@ -14,65 +20,64 @@ def create_roles_and_permissions(sender, **kwargs):
     """
     Create default roles (Admin, Project Manager, Developer, Tester)
     and assign relevant permissions for Projects, Features, ProjectFeatures, and Issues.
+    Runs once per migrate, after the permissions of all four apps exist.
+    A Redis outage does not fail the migration.
     """
-
-    if sender.name not in ["apps.users", "apps.projects", "apps.features", "apps.issues"]:
+    last_app = [config.name for config in apps.get_app_configs() if config.name in BOOTSTRAP_APPS][-1]
+    if sender.name != last_app:
         return
 
-    # Groups
-    groups = {
-        "Admin": Group.objects.get_or_create(name="Admin")[0],
-        "Project Manager": Group.objects.get_or_create(name="Project Manager")[0],
-        "Developer": Group.objects.get_or_create(name="Developer")[0],
-        "Tester": Group.objects.get_or_create(name="Tester")[0],
-    }
-
-    # Models
-    models = {
-        "Project": Project,
-        "Feature": Feature,
-        "ProjectFeature": ProjectFeature,
-        "Issue": Issue,
-    }
-
-    # Permission mapping
-    permissions_map = {
-        "Admin": {
-            Project: ["add", "view", "change", "delete"],
-            Feature: ["add", "view", "change", "delete"],
-            ProjectFeature: ["add", "view", "change", "delete"],
-            Issue: ["add", "view", "change", "delete"],
-        },
-        "Project Manager": {
-            Project: ["add", "view", "change", "delete"],
-            Feature: ["add", "view", "change", "delete"],
-            ProjectFeature: ["add", "view", "change", "delete"],
-            Issue: ["add", "view"],  # PMs can add and view Issues
-        },
-        "Developer": {
-            Project: ["view"],  # can list only
-            Feature: ["add", "view", "change"],  # add + update + list
-            ProjectFeature: ["add", "view", "change"],  # same as features
-            Issue: ["add", "view", "change"],  # add + update + list
-        },
-        "Tester": {
-            Project: ["view"],  # can list only
-            Feature: ["view"],  # can only list features
-            ProjectFeature: ["view"],  # can only list project features
-            Issue: ["add", "view", "change"],  # add + update + list
-        },
-    }
-
-    # Assign permissions
-    for role, models_perms in permissions_map.items():
-        group = groups[role]
-        for model, actions in models_perms.items():
-            content_type = ContentType.objects.get_for_model(model)
-            for action in actions:
-                codename = f"{action}_{model._meta.model_name}"
-                try:
-                    perm = Permission.objects.get(content_type=content_type, codename=codename)
-                    group.permissions.add(perm)
-                except Permission.DoesNotExist:
-                    print(f"Permission {codename} not found for {model}")
+    try:
+        bootstrap_roles(using=kwargs.get('using', DEFAULT_DB_ALIAS))
+    except RedisError as exc:
+        print(
+            f"Roles bootstrapped, but the permission version could not be bumped ({exc}). "
+            "Tokens issued earlier keep their old permissions until they expire."
+        )
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_token_permissions(sender, action, **kwargs):
+    """Group permissions changed: permission masks in existing tokens are stale."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_permission_version()
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_token_permissions_on_group_delete(sender, **kwargs):
+    bump_permission_version()
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_token_user_cache(sender, instance, **kwargs):
+    """Drop the cached row behind request.user for this user."""
+    invalidate_cached_user(instance.pk)
 
+
+@receiver(post_save, sender=CustomUser)
+def revoke_tokens_of_inactive_user(sender, instance, created, **kwargs):
+    """Deactivating a user revokes all of their outstanding tokens."""
+    # Instances not loaded from the database count as previously active
+    was_active = getattr(instance, '_loaded_is_active', None) is not False
+    if not created and was_active and not instance.is_active:
+        revoke_user_tokens([instance.pk])
+    instance._loaded_is_active = instance.is_active
+
+
+@receiver(post_delete, sender=CustomUser)
+def revoke_tokens_of_deleted_user(sender, instance, **kwargs):
+    revoke_user_tokens([instance.pk])
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def revoke_refresh_families_on_role_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Refresh token families cache the user's role, so a group change ends them
+    and the next login picks up the new role.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        revoke_user_refresh_families([instance.pk])
+    elif pk_set:
+        revoke_user_refresh_families(pk_set)
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import Group
+from django.test import TestCase
+
+from apps.monitoring.queries import inspect_queries
+from apps.utils import generate_tokens
+from .models import CustomUser
+
+
+class ListUsersQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_group, _ = Group.objects.get_or_create(name='Admin')
+        developer_group, _ = Group.objects.get_or_create(name='Developer')
+        cls.admin = CustomUser.objects.create_user(username='admin', email='admin@example.com')
+        cls.admin.groups.add(cls.admin_group)
+        for index in range(5):
+            user = CustomUser.objects.create_user(username=f"user{index}", email=f"user{index}@example.com")
+            user.groups.add(developer_group)
+
+    def test_list_users_prefetches_groups(self):
+        token = generate_tokens(self.admin)['access_token']
+
+        # Strict mode raises QueryBudgetExceeded if groups are loaded per user
+        with inspect_queries(label='users', strict=True, repeat_threshold=1):
+            response = self.client.get('/api/users/', HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        self.assertEqual(response.status_code, 200)
+        roles = {user['username']: user['role'] for user in response.json()['data']}
+        self.assertEqual(roles['admin'], 'Admin')
+        self.assertEqual({roles[f"user{index}"] for index in range(5)}, {'Developer'})
@@ -1,7 +1,8 @@
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
-from ..utils import format_response, validate_request_payload, require_token
+from django.db.models import Prefetch
+from ..utils import format_response, validate_request_payload, require_token, revoke_user_tokens, apply_changes
 import json
 import secrets
 import string
@@ -13,7 +14,9 @@ User = get_user_model()
 def users(request):
     """List all users or create a new user."""
     if request.method == 'GET':
-        users = User.objects.all()
+        users = User.objects.prefetch_related(
+            Prefetch('groups', queryset=Group.objects.order_by('pk'), to_attr='ordered_groups')
+        )
         data = [{
             'id': user.id,
             'username': user.username,
@@ -23,7 +26,7 @@ def users(request):
             'is_staff': user.is_staff,
             'phone_number': user.phone_number,
             'gender': user.gender,
-            'role' : user.groups.first().name if user.groups.exists() else None
+            'role' : user.ordered_groups[0].name if user.ordered_groups else None
         } for user in users]
         return format_response(
             message="Users retrieved successfully",
@@ -168,17 +171,23 @@ def update_user(request, user_id):
 
     try:
         data = json.loads(request.body)
-        user.email = data.get('email', user.email)
-        user.username = data.get('email', user.username)  # Keep username in sync with email
-        user.first_name = data.get('first_name', user.first_name)
-        user.last_name = data.get('last_name', user.last_name)
-        user.phone_number = data.get('phone_number', user.phone_number)
-        user.gender = data.get('gender', user.gender)
+        changes = {
+            key: data[key] for key in ('email', 'first_name', 'last_name', 'phone_number', 'gender') if key in data
+        }
+        if 'email' in changes:
+            changes['username'] = changes['email']  # Keep username in sync with email
+        changed = apply_changes(user, changes, list(changes))
         
         if data.get('password'):
             user.set_password(data['password'])
+            changed.append('password')
         
-        user.save()
+        if changed:
+            user.save(update_fields=changed)
+
+        # A new password ends every existing session
+        if data.get('password'):
+            revoke_user_tokens([user.id])
         
         user_data = {
             'id': user.id,
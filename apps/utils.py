@@ -1,4 +1,5 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+import asyncio
 import jwt
 import time
 from issue_tracker_api import settings
@@ -8,12 +9,145 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from django.contrib.auth import get_user_model
 import datetime
-import redis
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache, wraps
+from pathlib import Path
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed448, ed25519, rsa
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django_redis import get_redis_connection
+from issue_tracker_api.db_routing import PIN_COOKIE_NAME
 
 User = get_user_model()
 
-# Initialize Redis client
-REDIS_CLIENT = redis.Redis(host='localhost', port=6379, db=1, decode_responses=True)
+# Shared Redis client. It reuses the connection pool of the default cache (see
+# settings.REDIS_* / CACHES), so the cache, blacklist and OTP code hold one pool.
+# Responses are bytes; json.loads and truthiness checks accept them as-is.
+REDIS_CLIENT = get_redis_connection('default')
+
+def redis_get_json_many(keys):
+    """
+    Fetch several JSON values in one round-trip.
+    Returns a dict of key -> decoded value, skipping missing keys.
+    """
+    if not keys:
+        return {}
+    values = REDIS_CLIENT.mget(keys)
+    return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+def redis_set_json_many(mapping, timeout):
+    """
+    Store several JSON values with the same expiry (seconds) in one pipelined round-trip.
+    """
+    if not mapping:
+        return
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for key, value in mapping.items():
+        pipe.setex(key, timeout, json.dumps(value))
+    pipe.execute()
+
+def redis_delete_many(keys):
+    """
+    Delete several keys in one round-trip. Returns the number of keys removed.
+    """
+    if not keys:
+        return 0
+    return REDIS_CLIENT.delete(*keys)
+
+# Public key types accepted for each asymmetric JWT algorithm
+_ASYMMETRIC_KEY_TYPES = {
+    'RS256': (rsa.RSAPublicKey,),
+    'EdDSA': (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey),
+}
+
+def _is_asymmetric():
+    return settings.JWT_ALGORITHM in _ASYMMETRIC_KEY_TYPES
+
+@lru_cache(maxsize=None)
+def _signing_key():
+    """
+    Return (key, kid) used to sign new tokens. Asymmetric keys are parsed once
+    per process from JWT_KEYS_DIR/<JWT_ACTIVE_KID>.pem.
+    """
+    if not _is_asymmetric():
+        return settings.JWT_SECRET_KEY, None
+    kid = settings.JWT_ACTIVE_KID
+    pem = (Path(settings.JWT_KEYS_DIR) / f"{kid}.pem").read_bytes()
+    return serialization.load_pem_private_key(pem, password=None), kid
+
+# Parsed public keys: (kid -> key, monotonic time of the last directory scan)
+_verification_key_cache = (None, 0.0)
+_verification_key_lock = threading.Lock()
+
+def _load_verification_keys():
+    keys = {}
+    for path in Path(settings.JWT_KEYS_DIR).glob('*.pub.pem'):
+        public_key = serialization.load_pem_public_key(path.read_bytes())
+        if isinstance(public_key, _ASYMMETRIC_KEY_TYPES[settings.JWT_ALGORITHM]):
+            keys[path.name[:-len('.pub.pem')]] = public_key
+    return keys
+
+def _verification_keys(rescan=False):
+    """
+    Parse every public key (JWT_KEYS_DIR/<kid>.pub.pem) once per process.
+    Returns {kid: public key}. Keeping retired keys in the directory keeps
+    their tokens valid until they expire, which is how keys are rotated.
+    With `rescan`, the directory is read again, at most once every
+    JWT_KEYS_RELOAD_INTERVAL seconds.
+    """
+    global _verification_key_cache
+    keys, scanned_at = _verification_key_cache
+    now = time.monotonic()
+    if keys is not None and not (rescan and now - scanned_at >= settings.JWT_KEYS_RELOAD_INTERVAL):
+        return keys
+    with _verification_key_lock:
+        keys, scanned_at = _verification_key_cache
+        if keys is None or (rescan and now - scanned_at >= settings.JWT_KEYS_RELOAD_INTERVAL):
+            keys = _load_verification_keys()
+            _verification_key_cache = (keys, time.monotonic())
+        return keys
+
+def _verification_key(kid):
+    keys = _verification_keys()
+    if kid not in keys:
+        # Possibly a key added since the last scan (rotation). Rescans are rate
+        # limited, so made-up kids cannot force disk reads on every request.
+        keys = _verification_keys(rescan=True)
+    if kid not in keys:
+        raise jwt.InvalidTokenError("Unknown signing key")
+    return keys[kid]
+
+def encode_token(payload):
+    """Sign a JWT with the active key; asymmetric tokens carry its kid header."""
+    key, kid = _signing_key()
+    headers = {'kid': kid} if kid else None
+    return jwt.encode(payload, key, algorithm=settings.JWT_ALGORITHM, headers=headers)
+
+def decode_token(token):
+    """
+    Verify and decode a JWT. Raises jwt.InvalidTokenError (or its
+    ExpiredSignatureError subclass) like jwt.decode.
+    """
+    if not _is_asymmetric():
+        return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    kid = jwt.get_unverified_header(token).get('kid')
+    return jwt.decode(token, _verification_key(kid), algorithms=[settings.JWT_ALGORITHM])
+
+def get_jwks():
+    """Public verification keys as a JSON Web Key Set."""
+    if not _is_asymmetric():
+        return {'keys': []}
+    algorithm = jwt.get_algorithm_by_name(settings.JWT_ALGORITHM)
+    keys = []
+    for kid, public_key in sorted(_verification_keys().items()):
+        jwk = algorithm.to_jwk(public_key, as_dict=True)
+        jwk.update({'kid': kid, 'use': 'sig', 'alg': settings.JWT_ALGORITHM})
+        keys.append(jwk)
+    return {'keys': keys}
 
 def get_user_role(user):
     """
@@ -35,113 +169,484 @@ def get_user_role(user):
             return role
     return user_groups[0]  # Fallback to first group if not in priority list
 
-def generate_tokens(user):
-    """
-    Generate access and refresh tokens for a user, including their role.
-    """
-    role = get_user_role(user)
-    
+def _issue_tokens(user_id, role, family_id, jti):
+    """Sign an access/refresh pair; the refresh token belongs to `family_id`."""
+    from apps.users.permissions import get_role_permission_mask
+
+    permission_mask, permission_version = get_role_permission_mask(role)
+    # Sub-second 'iat' so revocation watermarks (see revoke_user_tokens) split a second
+    now = time.time()
+
     access_payload = {
-        'user_id': user.id,
+        'user_id': user_id,
         'role': role,
-        'exp': int(time.time()) + settings.JWT_ACCESS_TOKEN_LIFETIME,
-        'iat': int(time.time()),
+        'perms': permission_mask,
+        'pv': permission_version,
+        'exp': int(now) + settings.JWT_ACCESS_TOKEN_LIFETIME,
+        'iat': now,
         'type': 'access'
     }
-    access_token = jwt.encode(access_payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    access_token = encode_token(access_payload)
 
     refresh_payload = {
-        'user_id': user.id,
+        'user_id': user_id,
         'role': role,
-        'exp': int(time.time()) + settings.JWT_REFRESH_TOKEN_LIFETIME,
-        'iat': int(time.time()),
+        'fid': family_id,
+        'jti': jti,
+        'exp': int(now) + settings.JWT_REFRESH_TOKEN_LIFETIME,
+        'iat': now,
         'type': 'refresh'
     }
-    refresh_token = jwt.encode(refresh_payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    refresh_token = encode_token(refresh_payload)
 
     return {
         'access_token': access_token,
         'refresh_token': refresh_token
     }
 
+def generate_tokens(user):
+    """
+    Generate access and refresh tokens for a user, including their role.
+    The access token also carries the role's permission bitmask and version.
+    Each login starts a new refresh token family (see rotate_refresh_token).
+    """
+    role = get_user_role(user)
+    family_id, jti = uuid.uuid4().hex, uuid.uuid4().hex
+
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    pipe.hset(f"refresh_family_{family_id}", mapping={'user_id': user.id, 'role': role, 'jti': jti})
+    pipe.expire(f"refresh_family_{family_id}", settings.JWT_REFRESH_TOKEN_LIFETIME)
+    pipe.sadd(f"refresh_families_{user.id}", family_id)
+    pipe.expire(f"refresh_families_{user.id}", settings.JWT_REFRESH_TOKEN_LIFETIME)
+    pipe.execute()
+
+    return _issue_tokens(user.id, role, family_id, jti)
+
+# Compare-and-swap the family's current jti. Returns the cached role when the
+# presented jti is current (and stores the new one), 0 when the family no longer
+# exists and -1 when an already rotated token is replayed, in which case the
+# whole family is deleted.
+_ROTATE_REFRESH_SCRIPT = REDIS_CLIENT.register_script("""
+local family = redis.call('HMGET', KEYS[1], 'jti', 'role')
+if not family[1] then
+    return 0
+end
+if family[1] ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return -1
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return family[2]
+""")
+
+def rotate_refresh_token(payload):
+    """
+    Exchange a decoded refresh token for a new access/refresh pair in one Redis
+    round-trip, reusing the role cached on the token family instead of reading
+    the user's groups. A refresh token can be used once: presenting it again
+    revokes its family, logging out whoever holds the newer token as well.
+    Returns (tokens, error_message).
+    """
+    family_id = payload.get('fid')
+    if not family_id or not payload.get('jti'):
+        return None, "Error : Invalid refresh token"
+
+    jti = uuid.uuid4().hex
+    result = _ROTATE_REFRESH_SCRIPT(
+        keys=[f"refresh_family_{family_id}"],
+        args=[payload['jti'], jti, settings.JWT_REFRESH_TOKEN_LIFETIME]
+    )
+    if result == 0:
+        return None, "Error : Refresh token has been revoked"
+    if result == -1:
+        return None, "Error : Refresh token reuse detected, please log in again"
+    return _issue_tokens(payload['user_id'], result.decode(), family_id, jti), ""
+
+def revoke_refresh_family(family_id):
+    REDIS_CLIENT.delete(f"refresh_family_{family_id}")
+
+def revoke_user_refresh_families(user_ids):
+    """Delete every refresh token family of the given users."""
+    keys = [f"refresh_families_{user_id}" for user_id in user_ids]
+    if not keys:
+        return
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for key in keys:
+        pipe.smembers(key)
+    family_keys = [
+        f"refresh_family_{family_id.decode()}"
+        for family_ids in pipe.execute()
+        for family_id in family_ids
+    ]
+    REDIS_CLIENT.delete(*keys, *family_keys)
+
+# Short-TTL per-process cache of user rows for TokenUser: {user_id: (expires_at, user)}.
+# Entries are dropped on CustomUser save/delete (apps.users.signals).
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def get_cached_user(user_id):
+    """
+    Return a copy of the user with this id, hitting the database at most once
+    per TOKEN_USER_CACHE_SECONDS. Raises User.DoesNotExist.
+    """
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry and entry[0] > now:
+            _user_cache.move_to_end(user_id)
+            return copy.copy(entry[1])
+
+    user = User.objects.get(id=user_id)
+    with _user_cache_lock:
+        _user_cache[user_id] = (now + settings.TOKEN_USER_CACHE_SECONDS, user)
+        _user_cache.move_to_end(user_id)
+        while len(_user_cache) > settings.TOKEN_USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return copy.copy(user)
+
+def invalidate_cached_user(user_id):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+class TokenUser:
+    """
+    request.user for token-authenticated requests. id, pk and role come from
+    the token payload; the first access to any other attribute loads the full
+    CustomUser through get_cached_user.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, payload):
+        self.id = self.pk = payload['user_id']
+        self.role = payload.get('role', 'None')
+        self._user = None
+
+    def __getattr__(self, name):
+        # Only called for attributes not set in __init__
+        if name.startswith('__') or name == '_user':
+            raise AttributeError(name)
+        if self._user is None:
+            self._user = get_cached_user(self.id)
+        return getattr(self._user, name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk and getattr(other, 'is_authenticated', False)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return f"TokenUser({self.id})"
+
+def authenticate_token(request):
+    """
+    Validate the Bearer access token on the request and attach a lazy
+    TokenUser as request.user.
+    Returns (payload, None) when valid, otherwise (None, error_response).
+    """
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None, format_response(
+            message="Error: Authorization header required",
+            data=[],
+            http_status=400
+        )
+
+    if not auth_header.startswith('Bearer '):
+        return None, format_response(
+            message="Error: Invalid Authorization header format",
+            data=[],
+            http_status=400
+        )
+
+    token = auth_header[len('Bearer '):].strip()
+    try:
+        payload = decode_token(token)
+    except jwt.ExpiredSignatureError:
+        return None, format_response(
+            message="Error: Token has expired",
+            data=[],
+            http_status=401
+        )
+    except jwt.InvalidTokenError:
+        return None, format_response(
+            message="Error: Invalid or expired token",
+            data=[],
+            http_status=401
+        )
+
+    # Check Redis blacklist and the user's revocation watermark
+    if is_token_revoked(token, payload):
+        return None, format_response(
+            message="Error: Invalid Authorization Token",
+            data=[],
+            http_status=401
+        )
+
+    if payload.get('type') != 'access':
+        return None, format_response(
+            message="Error: Token is not an access token",
+            data=[],
+            http_status=401
+        )
+
+    request.user = TokenUser(payload)
+    return payload, None
+
+def _guard_view(view_func, check):
+    """
+    Wrap a sync or async view so `check(request)` runs first; a response
+    returned by the check is sent instead of calling the view.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            # The check talks to Redis synchronously
+            error_response = await sync_to_async(check)(request)
+            if error_response:
+                return error_response
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        error_response = check(request)
+        if error_response:
+            return error_response
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
 def require_token(allowed_roles=None):
     """
     Decorator to require a valid JWT access token with a specific role.
-    Attaches the authenticated user to the request if valid.
+    Attaches the authenticated user to the request if valid. Works on sync
+    and async views.
     
     Args:
         allowed_roles (list, optional): List of roles allowed to access the endpoint.
             If None, any role is allowed (but token must still be valid).
     """
+    def check(request):
+        payload, error_response = authenticate_token(request)
+        if error_response:
+            return error_response
+
+        # Check role as first step of authorization
+        user_role = payload.get('role', 'None')
+        if allowed_roles is not None and user_role not in allowed_roles:
+            return format_response(
+                message=f"Error: Access restricted",
+                data=[],
+                http_status=403
+            )
+        return None
+
     def decorator(view_func):
-        def wrapper(request, *args, **kwargs):
-            auth_header = request.headers.get('Authorization')
-            if not auth_header:
-                return format_response(
-                    message="Error: Authorization header required",
-                    data=[],
-                    http_status=400
-                )
+        return _guard_view(view_func, check)
+    return decorator
 
-            if not auth_header.startswith('Bearer '):
-                return format_response(
-                    message="Error: Invalid Authorization header format",
-                    data=[],
-                    http_status=400
-                )
+def require_permission(codename):
+    """
+    Decorator to require a valid JWT access token whose embedded permission
+    bitmask grants `codename` (e.g. 'change_issue'). The check is a bit test
+    against the token, no database query. Tokens minted before the last
+    group-permission change are rejected so the client refreshes them; a
+    token newer than this process's cached version is accepted, since
+    versions only grow.
+    """
+    from apps.users.permissions import PERMISSION_BITS, get_permission_version
 
-            token = auth_header[len('Bearer '):].strip()
-            # Check Redis blacklist
-            if REDIS_CLIENT.get(f"blacklist_{token}"):
-                return format_response(
-                    message="Error: Invalid Authorization Token",
-                    data=[],
-                    http_status=401
-                )
+    permission_bit = PERMISSION_BITS[codename]
+
+    def check(request):
+        payload, error_response = authenticate_token(request)
+        if error_response:
+            return error_response
+
+        if payload.get('pv', -1) < get_permission_version():
+            return format_response(
+                message="Error: Token permissions are outdated, please refresh your token",
+                data=[],
+                http_status=401
+            )
+
+        if not payload.get('perms', 0) & permission_bit:
+            return format_response(
+                message="Error: Access restricted",
+                data=[],
+                http_status=403
+            )
+        return None
+
+    def decorator(view_func):
+        return _guard_view(view_func, check)
+    return decorator
+
+# Single-flight state for coalesce_requests: request key -> Future of a response snapshot
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Take the lock, or report who holds it: returns the holder's token (ours if acquired)
+_ACQUIRE_LOCK_SCRIPT = REDIS_CLIENT.register_script("""
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return ARGV[1]
+end
+return redis.call('GET', KEYS[1])
+""")
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK_SCRIPT = REDIS_CLIENT.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+def _response_snapshot(response):
+    # Cookies are per client and stay out; every other header is shared
+    return {
+        'status': response.status_code,
+        'headers': list(response.items()),
+        'body': response.content.decode(),
+    }
+
+def _response_from_snapshot(snapshot):
+    return HttpResponse(snapshot['body'], status=snapshot['status'], headers=dict(snapshot['headers']))
+
+def _poll_coalescing_lock(key, token, observed):
+    """
+    Look for the result of the leader `observed` earlier, otherwise try to take
+    the lock for `key`. Returns (holder, result): holder is the token of the
+    current leader (`token` itself if acquired) and result its published
+    snapshot, if any. Results are stored per leader token, so a follower never
+    picks up the result of an earlier leader.
+    """
+    if observed is not None:
+        raw = REDIS_CLIENT.get(f"coalesce_result_{key}_{observed}")
+        if raw:
+            return observed, json.loads(raw)
+    holder = _ACQUIRE_LOCK_SCRIPT(
+        keys=[f"coalesce_lock_{key}"], args=[token, settings.REQUEST_COALESCING['LOCK_TIMEOUT']]
+    )
+    if holder is None:
+        # Released between the SET and the GET; try again on the next poll
+        return observed, None
+    holder = holder.decode() if isinstance(holder, bytes) else holder
+    if holder in (token, observed):
+        return holder, None
+    raw = REDIS_CLIENT.get(f"coalesce_result_{key}_{holder}")
+    return holder, json.loads(raw) if raw else None
 
+def _publish_and_release(key, token, snapshot):
+    """Publish the leader's 200 snapshot (if given) and release its lock."""
+    if snapshot is not None:
+        REDIS_CLIENT.set(
+            f"coalesce_result_{key}_{token}", json.dumps(snapshot),
+            ex=settings.REQUEST_COALESCING['RESULT_TTL']
+        )
+    _RELEASE_LOCK_SCRIPT(keys=[f"coalesce_lock_{key}"], args=[token])
+
+async def _coalesce_across_processes(key, compute):
+    """
+    Await `compute()` while holding a short Redis lock for `key`, publishing a
+    200 result for other processes. If another process holds the lock, wait
+    for its result instead (computing locally if none appears before
+    LOCK_TIMEOUT). Waiting sleeps on the event loop, not in a worker thread.
+    Returns (response or None, snapshot).
+    """
+    config = settings.REQUEST_COALESCING
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + config['LOCK_TIMEOUT']
+    # Redis round trips run off the shared thread that serves sync views
+    poll = sync_to_async(_poll_coalescing_lock, thread_sensitive=False)
+
+    holder = None
+    while True:
+        holder, snapshot = await poll(key, token, holder)
+        acquired = holder == token
+        if acquired:
+            break
+        if snapshot is not None:
+            return None, snapshot
+        if time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(config['POLL_INTERVAL'])
+
+    published = None
+    try:
+        response = await compute()
+        snapshot = _response_snapshot(response)
+        if response.status_code == 200:
+            published = snapshot
+        return response, snapshot
+    finally:
+        if acquired:
+            await sync_to_async(_publish_and_release, thread_sensitive=False)(key, token, published)
+
+def coalesce_requests(view_func):
+    """
+    Single-flight GETs: concurrent identical requests (same path, query string
+    and token role) share one run of the view. Within a process followers wait
+    on the leader's future; across processes a short Redis lock elects the
+    leader and followers pick up its published result. Clients pinned to the
+    primary after a write always run the view themselves.
+    The wrapped view is async so followers wait without holding a thread;
+    `view_func` itself still runs synchronously.
+    Apply below require_token so the role is known.
+    """
+    run_view = sync_to_async(view_func)
+
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET' or PIN_COOKIE_NAME in request.COOKIES:
+            return await run_view(request, *args, **kwargs)
+
+        user = request.__dict__.get('user')
+        role = user.role if type(user) is TokenUser else None
+        query = '&'.join(sorted(request.GET.urlencode().split('&')))
+        key = hashlib.sha256(f"{request.path}?{query}|{role}".encode()).hexdigest()
+
+        with _inflight_lock:
+            future = _inflight.get(key)
+            leader = future is None
+            if leader:
+                future = _inflight[key] = Future()
+
+        if not leader:
             try:
-                payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-                if payload['type'] != 'access':
-                    return format_response(
-                        message="Error: Token is not an access token",
-                        data=[],
-                        http_status=401
-                    )
-
-                # Check role as first step of authorization
-                user_role = payload.get('role', 'None')
-                if allowed_roles is not None and user_role not in allowed_roles:
-                    return format_response(
-                        message=f"Error: Access restricted",
-                        data=[],
-                        http_status=403
-                    )
-
-                # user_id = payload['user_id']
-                # request.user = User.objects.get(id=user_id)
-            except jwt.ExpiredSignatureError:
-                return format_response(
-                    message="Error: Token has expired",
-                    data=[],
-                    http_status=401
-                )
-            except (jwt.InvalidTokenError, User.DoesNotExist):
-                return format_response(
-                    message="Error: Invalid or expired token",
-                    data=[],
-                    http_status=401
+                # Shielded so a timed-out follower does not cancel the leader's future
+                snapshot = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(future)),
+                    timeout=settings.REQUEST_COALESCING['LOCK_TIMEOUT']
                 )
+                return _response_from_snapshot(snapshot)
+            except Exception:
+                # The leader failed or is too slow; serve this request directly
+                return await run_view(request, *args, **kwargs)
 
-            return view_func(request, *args, **kwargs)
-        return wrapper
-    return decorator
+        try:
+            response, snapshot = await _coalesce_across_processes(
+                key, lambda: run_view(request, *args, **kwargs)
+            )
+            future.set_result(snapshot)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+        return response if response is not None else _response_from_snapshot(snapshot)
+    return wrapper
 
 def blacklist_token(token):
     """
     Add token to Redis blacklist with expiration matching its original expiry.
     """
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_token(token)
         expiry = datetime.datetime.fromtimestamp(payload['exp'])
         timeout = max(0, int((expiry - datetime.datetime.utcnow()).total_seconds()))
         REDIS_CLIENT.setex(f"blacklist_{token}", timeout, "true")
@@ -149,44 +654,87 @@ def blacklist_token(token):
         # If token is invalid, blacklist it indefinitely
         REDIS_CLIENT.set(f"blacklist_{token}", "true")
 
+def is_token_revoked(token, payload):
+    """
+    True when the token is blacklisted or was issued before the user's
+    revocation watermark. Both keys are read in one MGET.
+    """
+    blacklisted, revoked_before = REDIS_CLIENT.mget(
+        f"blacklist_{token}", f"revoked_before_{payload['user_id']}"
+    )
+    if blacklisted:
+        return True
+    return revoked_before is not None and payload.get('iat', 0) < float(revoked_before)
+
+def revoke_user_tokens(user_ids):
+    """
+    Invalidate every token issued so far to the given users by moving their
+    revocation watermark to now: one key per user, however many sessions
+    they have. Watermark and 'iat' have sub-second resolution, so every token
+    issued before the call is revoked while those of a login right after it
+    stay valid; refresh token families existing now are deleted outright.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    watermark = time.time()
+    pipe = REDIS_CLIENT.pipeline(transaction=False)
+    for user_id in user_ids:
+        # No token outlives the refresh lifetime, so neither does the watermark
+        pipe.set(f"revoked_before_{user_id}", watermark, ex=settings.JWT_REFRESH_TOKEN_LIFETIME)
+    pipe.execute()
+    revoke_user_refresh_families(user_ids)
+
 def generate_otp():
     """
     Generate a random 6-digit OTP.
     """
     return str(secrets.randbelow(900000) + 100000)  # 100000–999999
 
+# Verify-and-consume in one round-trip. Returns {1, user_id} on a match (the
+# entry is deleted), {0, 0} when no OTP is stored (unknown or expired token) and
+# {-1, attempts} on a mismatch; the entry is deleted once attempts reach the limit.
+_VERIFY_OTP_SCRIPT = REDIS_CLIENT.register_script("""
+local stored = redis.call('HMGET', KEYS[1], 'otp', 'user_id')
+if not stored[1] then
+    return {0, 0}
+end
+if stored[1] == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    return {1, tonumber(stored[2])}
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+end
+return {-1, attempts}
+""")
+
 def store_otp(user_id, otp, temp_token):
     """
-    Store OTP with user_id and expiration time (5 minutes) in Redis using temp_token as key.
+    Store OTP with user_id and an attempt counter in a Redis hash keyed by temp_token.
+    Expiry (settings.OTP_LIFETIME) is enforced by the key TTL.
     """
-    expires_at = int(time.time()) + 300  # 5 minutes in seconds
-    otp_data = {
-        'user_id': user_id,
-        'otp': otp,
-        'expires_at': expires_at
-    }
-    REDIS_CLIENT.setex(f"otp_{temp_token}", 300, json.dumps(otp_data))
+    key = f"otp_{temp_token}"
+    pipe = REDIS_CLIENT.pipeline(transaction=True)
+    pipe.hset(key, mapping={'user_id': user_id, 'otp': otp, 'attempts': 0})
+    pipe.expire(key, settings.OTP_LIFETIME)
+    pipe.execute()
 
 def validate_otp(temp_token, otp):
     """
-    Validate OTP against stored value in Redis using temp_token and check expiration.
+    Atomically verify and consume the OTP stored for temp_token (one Redis round-trip).
+    Concurrent verifications of the same OTP cannot both succeed.
     Returns (is_valid, user_id, error_message).
     """
-    otp_data_json = REDIS_CLIENT.get(f"otp_{temp_token}")
-    if not otp_data_json:
-        return False, None, "Error: Invalid temporary token"
-    
-    otp_data = json.loads(otp_data_json)
-    if int(time.time()) > otp_data['expires_at']:
-        REDIS_CLIENT.delete(f"otp_{temp_token}")
-        return False, None, "Error: OTP has expired"
-    
-    if otp != otp_data['otp']:
-        return False, None, "Error: Invalid OTP"
-    
-    user_id = otp_data['user_id']
-    REDIS_CLIENT.delete(f"otp_{temp_token}")  # Remove OTP after validation
-    return True, user_id, ""
+    status, value = _VERIFY_OTP_SCRIPT(keys=[f"otp_{temp_token}"], args=[otp, settings.OTP_MAX_ATTEMPTS])
+    if status == 1:
+        return True, value, ""
+    if status == 0:
+        return False, None, "Error: Invalid or expired temporary token"
+    if value >= settings.OTP_MAX_ATTEMPTS:
+        return False, None, "Error: Too many invalid OTP attempts, please log in again"
+    return False, None, "Error: Invalid OTP"
 
 def format_response(message, data=None, http_status=200):
     """
@@ -201,6 +749,38 @@ def format_response(message, data=None, http_status=200):
     }
     return JsonResponse(response, status=http_status)
 
+def requested_includes(request):
+    """Optional response sections requested with ?include=a,b."""
+    return {part.strip() for part in request.GET.get('include', '').split(',') if part.strip()}
+
+def apply_changes(instance, data, fields):
+    """
+    Copy the keys of `data` listed in `fields` onto `instance`, skipping values
+    equal to the current ones. Returns the names of the fields that changed,
+    for save(update_fields=...); an empty list means there is nothing to write.
+    """
+    changed = []
+    for key in fields:
+        if key in data and getattr(instance, key) != data[key]:
+            setattr(instance, key, data[key])
+            changed.append(key)
+    return changed
+
+def expected_version(request, data, instance):
+    """
+    Version a client's edit is based on: the If-Match header (the ETag of an
+    earlier response) or a 'version' key, which is popped from `data`. Defaults
+    to the version of the row just read. Returns (version, error_message).
+    """
+    version = data.pop('version', None)
+    if_match = request.headers.get('If-Match', '').strip()
+    if if_match and if_match != '*':
+        tag = if_match.removeprefix('W/').strip('"')
+        if not tag.isdigit():
+            return None, "Error: Invalid If-Match header"
+        version = int(tag)
+    return (instance.version if version is None else version), None
+
 def validate_request_payload(data, required_keys, allowed_keys=None, key_types=None):
     """
     Check if the payload contains all required keys, only allowed keys (if specified), 
@@ -232,8 +812,8 @@ def generate_temp_token(user_id):
     """
     payload = {
         'user_id': user_id,
-        'exp': int(time.time()) + 300,  # 5 minutes expiration
+        'exp': int(time.time()) + settings.OTP_LIFETIME,  # 5 minutes expiration
         'iat': int(time.time()),
         'type': 'temp'
     }
-    return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
\ No newline at end of file
+    return encode_token(payload)
\ No newline at end of file
@@ -0,0 +1,408 @@
+"""
+Outgoing webhook delivery.
+
+Issue changes are queued as events with one LPUSH after commit (signals.py);
+`manage.py run_webhook_dispatcher` drains the queue in batches, matches the
+events against the active subscriptions of their projects with one query and
+POSTs each subscription its events as a single signed batch. Every endpoint has
+its own backlog and at most WEBHOOKS['PER_ENDPOINT_CONCURRENCY'] requests in
+flight, and requests are settled as they finish, so a slow endpoint only holds
+up its own deliveries; what does not fit in its backlog waits in Redis. Failed
+deliveries wait in the ``webhook_retry`` sorted set with exponential backoff
+and move to the ``webhook_dead_letter`` list after MAX_ATTEMPTS, or at once
+when the endpoint rejects them with a non-retryable status; the list keeps the
+newest WEBHOOKS['MAX_DEAD_LETTERS'].
+
+Every request is signed:
+
+    X-Webhook-Timestamp: <unix seconds>
+    X-Webhook-Signature: sha256=<hex HMAC-SHA256 of "<timestamp>.<body>" keyed by the subscription secret>
+
+Targets must be public addresses: URLs resolving to loopback, private,
+link-local or other non-global ranges are refused when subscribing, and the
+peer address of every outgoing connection is checked again, so a DNS change
+after subscribing cannot point deliveries at internal services.
+WEBHOOKS['ALLOW_PRIVATE_TARGETS'] lifts this for local testing only.
+"""
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import HTTPHandler, HTTPRedirectHandler, HTTPSHandler, ProxyHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Q
+
+from ..utils import REDIS_CLIENT
+from .models import WebhookSubscription
+
+QUEUE_KEY = 'webhook_events'
+RETRY_KEY = 'webhook_retry'
+DEAD_LETTER_KEY = 'webhook_dead_letter'
+
+# Client errors worth retrying; any other non-2xx below 500 is dead-lettered at once
+_RETRYABLE_STATUSES = {408, 425, 429}
+
+# Pop up to ARGV[2] members of the sorted set KEYS[1] scored <= ARGV[1]
+_POP_DUE_SCRIPT = REDIS_CLIENT.register_script("""
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+""")
+
+
+# Pop every dead letter of KEYS[1] and schedule it in the retry set KEYS[2] at
+# ARGV[1] with its attempt count reset, atomically; returns how many moved
+_REQUEUE_DEAD_LETTERS_SCRIPT = REDIS_CLIENT.register_script("""
+local moved = 0
+local raw = redis.call('RPOP', KEYS[1])
+while raw do
+    local delivery = cjson.decode(raw)
+    delivery['attempt'] = 1
+    redis.call('ZADD', KEYS[2], ARGV[1], cjson.encode(delivery))
+    moved = moved + 1
+    raw = redis.call('RPOP', KEYS[1])
+end
+return moved
+""")
+
+
+class BlockedTargetError(OSError):
+    """The webhook target is not a public address."""
+
+
+def _is_public_address(address):
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_target(url):
+    """Error message when `url` does not resolve to public addresses only, else None."""
+    if settings.WEBHOOKS['ALLOW_PRIVATE_TARGETS']:
+        return None
+    parts = urlsplit(url)
+    try:
+        addresses = {
+            info[4][0] for info in socket.getaddrinfo(
+                parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80), type=socket.SOCK_STREAM
+            )
+        }
+    except (socket.gaierror, UnicodeError, ValueError):
+        return "Error: Webhook url host does not resolve"
+    if not all(_is_public_address(address) for address in addresses):
+        return "Error: Webhook url must resolve to a public address"
+    return None
+
+
+def _create_public_connection(address, *args, **kwargs):
+    """socket.create_connection that refuses non-public peers (checked after DNS, before any data)."""
+    sock = socket.create_connection(address, *args, **kwargs)
+    peer = sock.getpeername()[0]
+    if not settings.WEBHOOKS['ALLOW_PRIVATE_TARGETS'] and not _is_public_address(peer):
+        sock.close()
+        raise BlockedTargetError(f"Refused non-public address {peer}")
+    return sock
+
+
+class _PublicHTTPConnection(HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPSConnection(HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _create_public_connection
+
+
+class _PublicHTTPHandler(HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    """Report redirects as failures instead of re-sending the payload as a GET."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+# No proxies (they would connect on our behalf, unchecked) and no redirects
+_opener = build_opener(ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _NoRedirect)
+
+
+def sign_payload(secret, timestamp, body):
+    """Hex HMAC-SHA256 of "<timestamp>.<body>" (body in bytes)."""
+    return hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, timestamp, body, signature, tolerance=300):
+    """Check an X-Webhook-Signature value and that its timestamp is recent."""
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except (TypeError, ValueError):
+        return False
+    return hmac.compare_digest(f"sha256={sign_payload(secret, timestamp, body)}", signature or '')
+
+
+def build_event(event_type, project_id, data):
+    return {
+        'id': uuid.uuid4().hex,
+        'type': event_type,
+        'project_id': project_id,
+        'occurred_at': int(time.time()),
+        'data': data,
+    }
+
+
+def enqueue_events(events):
+    """Queue events for the dispatcher (one round-trip)."""
+    if events:
+        REDIS_CLIENT.lpush(QUEUE_KEY, *(json.dumps(event, cls=DjangoJSONEncoder) for event in events))
+
+
+def retry_delay(attempt):
+    """Exponential backoff after failed attempt number `attempt`."""
+    return settings.WEBHOOKS['RETRY_BACKOFF'] * 2 ** (attempt - 1)
+
+
+def requeue_dead_letters():
+    """Give every dead-lettered delivery a fresh set of attempts. Returns how many."""
+    return _REQUEUE_DEAD_LETTERS_SCRIPT(keys=[DEAD_LETTER_KEY, RETRY_KEY], args=[time.time()])
+
+
+class Dispatcher:
+    """Delivers queued events; see the module docstring."""
+
+    def __init__(self, log=print):
+        self.log = log
+        self.pool = ThreadPoolExecutor(max_workers=settings.WEBHOOKS['MAX_WORKERS'])
+        # url -> deque of (delivery, subscription) waiting for a free slot
+        self.backlog = defaultdict(deque)
+        # url -> requests in flight, and future -> its (delivery, subscription)
+        self.active = defaultdict(int)
+        self.in_flight = {}
+
+    def _take_retries(self):
+        raw = _POP_DUE_SCRIPT(keys=[RETRY_KEY], args=[time.time(), settings.WEBHOOKS['BATCH_SIZE']])
+        return [json.loads(item) for item in raw]
+
+    def _take_events(self, timeout):
+        """
+        Block up to `timeout` seconds (0 = return immediately) for the first
+        event, then take up to BATCH_SIZE - 1 more in a single RPOP.
+        """
+        size = settings.WEBHOOKS['BATCH_SIZE']
+        if timeout:
+            first = REDIS_CLIENT.brpop(QUEUE_KEY, timeout=timeout)
+            raw = [first[1]] if first else []
+        else:
+            raw = REDIS_CLIENT.rpop(QUEUE_KEY, 1) or []
+        if raw and size > 1:
+            raw.extend(REDIS_CLIENT.rpop(QUEUE_KEY, size - 1) or [])
+        return [json.loads(item) for item in raw]
+
+    def _plan(self, events, retries):
+        """
+        (delivery, subscription) pairs for this round: one batch per subscription
+        with matching new events, plus the due retries. Retries of subscriptions
+        deleted or deactivated since are dropped.
+        """
+        project_ids = {event['project_id'] for event in events}
+        retry_ids = {delivery['subscription_id'] for delivery in retries}
+        if not project_ids and not retry_ids:
+            return []
+
+        subscriptions = {
+            subscription.id: subscription
+            for subscription in WebhookSubscription.objects.filter(
+                Q(project_id__in=project_ids) | Q(id__in=retry_ids), is_active=True
+            ).only('id', 'project_id', 'url', 'secret', 'events')
+        }
+        by_project = defaultdict(list)
+        for subscription in subscriptions.values():
+            by_project[subscription.project_id].append(subscription)
+
+        batches = defaultdict(list)
+        for event in events:
+            for subscription in by_project[event['project_id']]:
+                if subscription.wants(event['type']):
+                    batches[subscription.id].append(event)
+
+        deliveries = [
+            ({'id': uuid.uuid4().hex, 'subscription_id': subscription_id, 'events': batch, 'attempt': 1},
+             subscriptions[subscription_id])
+            for subscription_id, batch in batches.items()
+        ]
+        deliveries.extend(
+            (delivery, subscriptions[delivery['subscription_id']])
+            for delivery in retries if delivery['subscription_id'] in subscriptions
+        )
+        return deliveries
+
+    def _send(self, delivery, subscription):
+        """POST one delivery. Returns None on success, else (retryable, error)."""
+        body = json.dumps({'id': delivery['id'], 'events': delivery['events']}).encode()
+        timestamp = str(int(time.time()))
+        request = Request(subscription.url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'User-Agent': 'issue-tracker-webhooks',
+            'X-Webhook-Id': delivery['id'],
+            'X-Webhook-Attempt': str(delivery['attempt']),
+            'X-Webhook-Timestamp': timestamp,
+            'X-Webhook-Signature': f"sha256={sign_payload(subscription.secret, timestamp, body)}",
+        })
+        try:
+            with _opener.open(request, timeout=settings.WEBHOOKS['TIMEOUT']):
+                return None
+        except HTTPError as exc:
+            return exc.code >= 500 or exc.code in _RETRYABLE_STATUSES, f"HTTP {exc.code}"
+        except URLError as exc:
+            if isinstance(exc.reason, BlockedTargetError):
+                return False, str(exc.reason)
+            return True, str(exc.reason) or type(exc).__name__
+        except (OSError, HTTPException) as exc:
+            return True, str(exc) or type(exc).__name__
+
+    def _queue(self, deliveries):
+        """
+        Append deliveries to their endpoint's backlog. Past MAX_BACKLOG_PER_ENDPOINT
+        they are parked in the retry set (attempt unchanged) rather than held in memory.
+        """
+        limit = settings.WEBHOOKS['MAX_BACKLOG_PER_ENDPOINT']
+        retry_at = time.time() + settings.WEBHOOKS['RETRY_BACKOFF']
+        parked = {}
+        for delivery, subscription in deliveries:
+            backlog = self.backlog[subscription.url]
+            if len(backlog) < limit:
+                backlog.append((delivery, subscription))
+            else:
+                parked[json.dumps(delivery)] = retry_at
+        if parked:
+            REDIS_CLIENT.zadd(RETRY_KEY, parked)
+
+    def _start(self):
+        """Start backlogged deliveries on every endpoint with a free slot."""
+        limit = settings.WEBHOOKS['PER_ENDPOINT_CONCURRENCY']
+        for url in list(self.backlog):
+            backlog = self.backlog[url]
+            while backlog and self.active[url] < limit:
+                delivery, subscription = backlog.popleft()
+                self.active[url] += 1
+                self.in_flight[self.pool.submit(self._send, delivery, subscription)] = (delivery, subscription)
+            if not backlog:
+                del self.backlog[url]
+
+    def _collect(self, timeout):
+        """Settle the requests finished within `timeout` seconds (None waits for one)."""
+        if not self.in_flight:
+            return 0, 0, 0
+        done, _ = wait(self.in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        outcomes = []
+        for future in done:
+            delivery, subscription = self.in_flight.pop(future)
+            self.active[subscription.url] -= 1
+            if not self.active[subscription.url]:
+                del self.active[subscription.url]
+            try:
+                failure = future.result()
+            except Exception as exc:
+                failure = (False, f"{type(exc).__name__}: {exc}")
+            outcomes.append((delivery, subscription, failure))
+        return self._settle(outcomes)
+
+    def _settle(self, outcomes):
+        """Schedule retries and dead letters in one round-trip. Returns the three counts."""
+        max_attempts = settings.WEBHOOKS['MAX_ATTEMPTS']
+        now = time.time()
+        delivered, retries, dead = 0, {}, []
+        for delivery, subscription, failure in outcomes:
+            if failure is None:
+                delivered += 1
+                continue
+            retryable, delivery['error'] = failure
+            if retryable and delivery['attempt'] < max_attempts:
+                retry_at = now + retry_delay(delivery['attempt'])
+                delivery['attempt'] += 1
+                retries[json.dumps(delivery)] = retry_at
+            else:
+                delivery.update(url=subscription.url, failed_at=int(now))
+                dead.append(json.dumps(delivery))
+            self.log(f"Webhook delivery {delivery['id']} to {subscription.url} failed: {delivery['error']}")
+
+        if retries or dead:
+            pipe = REDIS_CLIENT.pipeline(transaction=False)
+            if retries:
+                pipe.zadd(RETRY_KEY, retries)
+            if dead:
+                pipe.lpush(DEAD_LETTER_KEY, *dead)
+                pipe.ltrim(DEAD_LETTER_KEY, 0, settings.WEBHOOKS['MAX_DEAD_LETTERS'] - 1)
+            pipe.execute()
+        return delivered, len(retries), len(dead)
+
+    def run_once(self, timeout=0):
+        """
+        Settle finished requests, take the due retries and one batch of new
+        events and start whatever endpoints have room for. Waits up to
+        `timeout` seconds for events when idle; when nothing new arrived but
+        requests are in flight, waits up to POLL_TIMEOUT for one to finish.
+        Returns the (delivered, retried, dead_lettered) counts settled.
+        """
+        settled = [self._collect(0)]
+        busy = bool(self.in_flight or self.backlog)
+        retries = self._take_retries()
+        events = self._take_events(0 if retries or busy else timeout)
+        try:
+            deliveries = self._plan(events, retries)
+        finally:
+            close_old_connections()
+        self._queue(deliveries)
+        self._start()
+        if not deliveries and self.in_flight:
+            settled.append(self._collect(settings.WEBHOOKS['POLL_TIMEOUT']))
+            self._start()
+        return tuple(map(sum, zip(*settled)))
+
+    def drain(self):
+        """Deliver until the queue is empty, nothing is in flight and no retry is due."""
+        while any(self.run_once()) or self.in_flight or self.backlog or REDIS_CLIENT.llen(QUEUE_KEY):
+            pass
+
+    def run_forever(self):
+        while True:
+            self.run_once(timeout=settings.WEBHOOKS['POLL_TIMEOUT'])
+
+    def stop(self):
+        """Finish the requests in flight and hand the backlog back to Redis."""
+        while self.in_flight:
+            self._collect(None)
+        now = time.time()
+        parked = {
+            json.dumps(delivery): now
+            for backlog in self.backlog.values() for delivery, _subscription in backlog
+        }
+        if parked:
+            REDIS_CLIENT.zadd(RETRY_KEY, parked)
+        self.backlog.clear()
+        self.pool.shutdown(wait=True)
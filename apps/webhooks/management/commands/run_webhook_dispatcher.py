@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.webhooks.delivery import Dispatcher, requeue_dead_letters
+
+
+class Command(BaseCommand):
+    help = "Deliver queued issue events to webhook subscriptions (see apps.webhooks.delivery)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Deliver until the queue is empty and no retry is due, then exit.")
+        parser.add_argument('--requeue-dead-letters', action='store_true',
+                            help="Retry every dead-lettered delivery before starting.")
+
+    def handle(self, *args, **options):
+        if options['requeue_dead_letters']:
+            self.stdout.write(f"Requeued {requeue_dead_letters()} dead-lettered deliveries")
+
+        dispatcher = Dispatcher(log=self.stdout.write)
+        self.stdout.write("Webhook dispatcher started")
+        try:
+            if options['once']:
+                dispatcher.drain()
+            else:
+                dispatcher.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Webhook dispatcher stopped")
+        finally:
+            dispatcher.stop()
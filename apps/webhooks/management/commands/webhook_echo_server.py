@@ -0,0 +1,60 @@
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from apps.webhooks.delivery import verify_signature
+
+
+class Command(BaseCommand):
+    help = (
+        "Local stand-in for a webhook receiver: prints every delivery and checks its "
+        "signature when --secret is given. --fail-rate makes it answer 503 at random "
+        "to exercise retries and --delay makes it slow. Run the API and dispatcher with WEBHOOKS_ALLOW_PRIVATE_TARGETS=1 "
+        "so they accept its loopback address."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--secret', default='', help="Subscription secret used to verify signatures.")
+        parser.add_argument('--fail-rate', type=float, default=0.0,
+                            help="Fraction of deliveries answered with 503 (0-1).")
+        parser.add_argument('--delay', type=float, default=0.0, help="Seconds to wait before answering.")
+
+    def handle(self, *args, **options):
+        stdout, secret, fail_rate, delay = self.stdout, options['secret'], options['fail_rate'], options['delay']
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                time.sleep(delay)
+                if secret and not verify_signature(
+                    secret, self.headers.get('X-Webhook-Timestamp'), body, self.headers.get('X-Webhook-Signature')
+                ):
+                    status = 401
+                elif random.random() < fail_rate:
+                    status = 503
+                else:
+                    status = 204
+                events = json.loads(body or b'{}').get('events', [])
+                stdout.write(
+                    f"{status} delivery {self.headers.get('X-Webhook-Id')} "
+                    f"attempt {self.headers.get('X-Webhook-Attempt')}: "
+                    f"{', '.join(event['type'] for event in events)}"
+                )
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        self.stdout.write(f"Webhook echo server listening on http://127.0.0.1:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Webhook echo server stopped")
+        finally:
+            server.server_close()
@@ -0,0 +1,29 @@
+from django.db import models
+from apps.projects.models import Project
+
+class WebhookSubscription(models.Model):
+    class Event(models.TextChoices):
+        ISSUE_CREATED = 'issue.created', 'Issue Created'
+        ISSUE_UPDATED = 'issue.updated', 'Issue Updated'
+        ISSUE_STATUS_CHANGED = 'issue.status_changed', 'Issue Status Changed'
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='webhook_subscriptions')
+    url = models.URLField(max_length=500)
+    # Shared secret for the HMAC-SHA256 signature on every delivery
+    secret = models.CharField(max_length=64)
+    # Event types to deliver; empty means all of them
+    events = models.JSONField(default=list, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.url} ({self.project_id})"
+
+    def wants(self, event_type):
+        return not self.events or event_type in self.events
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['project', 'is_active'])]
@@ -0,0 +1,38 @@
+# apps/webhooks/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.issues.models import Issue
+from .delivery import build_event, enqueue_events
+from .models import WebhookSubscription
+
+Event = WebhookSubscription.Event
+
+
+@receiver(post_save, sender=Issue)
+def queue_issue_webhooks(sender, instance, created, **kwargs):
+    data = {
+        'id': instance.pk,
+        'title': instance.title,
+        'status': instance.status,
+        'priority': instance.priority,
+        'category': instance.category,
+        'description': instance.description,
+        'project_feature_id': instance.project_feature_id,
+        'created_at': instance.created_at,
+        'updated_at': instance.updated_at,
+    }
+    if created:
+        events = [build_event(Event.ISSUE_CREATED, instance.project_id, data)]
+    else:
+        events = [build_event(Event.ISSUE_UPDATED, instance.project_id, data)]
+        previous_status = getattr(instance, '_loaded_status', None)
+        if previous_status is not None and previous_status != instance.status:
+            events.append(build_event(Event.ISSUE_STATUS_CHANGED, instance.project_id, {
+                **data, 'previous_status': previous_status,
+            }))
+    instance._loaded_status = instance.status
+
+    # robust: a Redis outage is logged, it does not fail the committed request
+    transaction.on_commit(lambda: enqueue_events(events), robust=True)
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('create/', views.create_subscription, name='create_webhook_subscription'),
+    path('projects/<int:project_id>/', views.list_subscriptions, name='list_webhook_subscriptions'),
+    path('<int:subscription_id>/update/', views.update_subscription, name='update_webhook_subscription'),
+    path('<int:subscription_id>/delete/', views.delete_subscription, name='delete_webhook_subscription'),
+]
@@ -0,0 +1,149 @@
+from django.views.decorators.csrf import csrf_exempt
+import json
+import secrets
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from apps.projects.models import Project
+from .delivery import check_target
+from .models import WebhookSubscription
+from ..utils import format_response, validate_request_payload, require_permission, apply_changes
+
+_validate_url = URLValidator(schemes=['http', 'https'])
+
+
+def _invalid_fields(data):
+    """Error message for a bad url or event list, or None."""
+    if 'url' in data:
+        try:
+            _validate_url(data['url'])
+        except ValidationError:
+            return "Error: Invalid url"
+        error_message = check_target(data['url'])
+        if error_message:
+            return error_message
+    if 'events' in data:
+        unknown = [event for event in data['events'] if event not in WebhookSubscription.Event.values]
+        if unknown:
+            return f"Error: Invalid event(s) {unknown}. Must be among {WebhookSubscription.Event.values}"
+    return None
+
+
+def _subscription_data(subscription, include_secret=False):
+    subscription_data = {
+        'id': subscription.id,
+        'project': subscription.project_id,
+        'url': subscription.url,
+        'events': subscription.events or WebhookSubscription.Event.values,
+        'is_active': subscription.is_active,
+        'created_at': subscription.created_at.isoformat(),
+        'updated_at': subscription.updated_at.isoformat(),
+    }
+    if include_secret:
+        subscription_data['secret'] = subscription.secret
+    return subscription_data
+
+
+@csrf_exempt
+@require_permission('change_project')
+def create_subscription(request):
+    """
+    Subscribe a URL to a project's issue events. The signing secret is only
+    returned here.
+    """
+    if request.method != 'POST':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    try:
+        data = json.loads(request.body)
+        required_keys = ['project_id', 'url']
+        allowed_keys = {'project_id', 'url', 'events'}
+        key_types = {'project_id': int, 'url': str, 'events': list}
+        is_valid, error_message = validate_request_payload(data, required_keys, allowed_keys, key_types)
+        if not is_valid:
+            return format_response(message=error_message, data=[], http_status=400)
+
+        error_message = _invalid_fields(data)
+        if error_message:
+            return format_response(message=error_message, data=[], http_status=400)
+
+        if not Project.objects.filter(id=data['project_id'], is_deleting=False).exists():
+            return format_response(message="Error: Project not found", data=[], http_status=404)
+
+        subscription = WebhookSubscription.objects.create(
+            project_id=data['project_id'],
+            url=data['url'],
+            events=sorted(set(data.get('events', []))),
+            secret=secrets.token_hex(32),
+        )
+        return format_response(
+            message="Webhook subscription created successfully",
+            data=_subscription_data(subscription, include_secret=True),
+            http_status=201
+        )
+    except json.JSONDecodeError:
+        return format_response(message="Error: Invalid JSON", data=[], http_status=400)
+
+
+@csrf_exempt
+@require_permission('view_project')
+def list_subscriptions(request, project_id):
+    """List a project's webhook subscriptions (secrets are not included)."""
+    if request.method != 'GET':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    subscriptions = WebhookSubscription.objects.filter(project_id=project_id)
+    return format_response(
+        message="Webhook subscriptions retrieved successfully",
+        data=[_subscription_data(subscription) for subscription in subscriptions],
+        http_status=200
+    )
+
+
+@csrf_exempt
+@require_permission('change_project')
+def update_subscription(request, subscription_id):
+    """Change a subscription's url or events, or pause it with is_active."""
+    if request.method != 'POST':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    try:
+        subscription = WebhookSubscription.objects.get(id=subscription_id)
+        data = json.loads(request.body)
+        allowed_keys = {'url', 'events', 'is_active'}
+        key_types = {'url': str, 'events': list, 'is_active': bool}
+        is_valid, error_message = validate_request_payload(data, [], allowed_keys, key_types)
+        if not is_valid:
+            return format_response(message=error_message, data=[], http_status=400)
+
+        error_message = _invalid_fields(data)
+        if error_message:
+            return format_response(message=error_message, data=[], http_status=400)
+
+        if 'events' in data:
+            data['events'] = sorted(set(data['events']))
+        changed = apply_changes(subscription, data, ['url', 'events', 'is_active'])
+        if changed:
+            subscription.save(update_fields=[*changed, 'updated_at'])
+
+        return format_response(
+            message="Webhook subscription updated successfully",
+            data=_subscription_data(subscription),
+            http_status=200
+        )
+    except json.JSONDecodeError:
+        return format_response(message="Error: Invalid JSON", data=[], http_status=400)
+    except WebhookSubscription.DoesNotExist:
+        return format_response(message="Error: Webhook subscription not found", data=[], http_status=404)
+
+
+@csrf_exempt
+@require_permission('change_project')
+def delete_subscription(request, subscription_id):
+    """Delete a subscription; its pending retries are dropped by the dispatcher."""
+    if request.method != 'POST':
+        return format_response(message="Error: Method not allowed", data=[], http_status=405)
+
+    deleted, _ = WebhookSubscription.objects.filter(id=subscription_id).delete()
+    if not deleted:
+        return format_response(message="Error: Webhook subscription not found", data=[], http_status=404)
+    return format_response(message="Webhook subscription deleted successfully", data=[], http_status=200)
@@ -2,6 +2,10 @@
 ASGI config for issue_tracker_api project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the API through it (the SSE change feed needs it; WSGI and runserver
+would buffer the endless stream):
+
+    uvicorn issue_tracker_api.asgi:application --host 0.0.0.0 --port 8000
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,92 @@
+"""
+Primary/replica database routing.
+
+Reads made while serving a safe (GET/HEAD/OPTIONS) request are spread
+round-robin across ``settings.DATABASE_REPLICAS``. Everything else - writes,
+reads in unsafe requests, reads after a write in the same request, management
+commands and workers - uses the ``default`` (primary) database.
+"""
+import contextvars
+import itertools
+
+from django.conf import settings
+
+PRIMARY_DB = 'default'
+PIN_COOKIE_NAME = 'db_pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Per-request routing flags shared between the middleware and the router."""
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to a replica only when the current request allows it.
+    A write pins the rest of the request (and, via a cookie, the client's next
+    few requests) to the primary so read-after-write stays consistent.
+    """
+
+    def __init__(self):
+        self.replicas = list(getattr(settings, 'DATABASE_REPLICAS', []))
+        self._counter = itertools.count()
+
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if not self.replicas or state is None or not state.use_replicas:
+            return PRIMARY_DB
+        return self.replicas[next(self._counter) % len(self.replicas)]
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.use_replicas = False
+            state.wrote = True
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY_DB, *self.replicas}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication, never directly.
+        if db in self.replicas:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Open a routing scope for each request. Safe requests may read from
+    replicas unless the client wrote recently (pin cookie present).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = PIN_COOKIE_NAME in request.COOKIES
+        state = RoutingState(use_replicas=request.method in SAFE_METHODS and not pinned)
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
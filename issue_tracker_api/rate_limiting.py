@@ -0,0 +1,135 @@
+"""
+Per-endpoint API rate limiting.
+
+Each (URL name, client) pair gets a token bucket in Redis, refilled
+continuously and checked/consumed by a single Lua call. Clients are identified
+by the user id in their access token, or by IP when unauthenticated; limits
+come from ``settings.RATE_LIMITS`` keyed by URL name and then by the token's
+role. A client that has been refused is remembered in-process until its
+bucket refills, so a client that keeps hammering is turned away without a
+Redis round-trip.
+"""
+import math
+import threading
+import time
+
+import jwt
+from django.conf import settings
+
+from apps.monitoring.metrics import REGISTRY
+from apps.utils import REDIS_CLIENT, decode_token, format_response
+
+# Refill, then take one token if available. Returns {1, 0} when allowed, or
+# {0, ms until a token is available}.
+_TOKEN_BUCKET_SCRIPT = REDIS_CLIENT.register_script("""
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, wait_ms = 0, 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait_ms = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, wait_ms}
+""")
+
+# Local pre-check: bucket key -> monotonic time until which it is known empty
+_blocked_until = {}
+_blocked_lock = threading.Lock()
+_MAX_BLOCKED_ENTRIES = 10000
+
+
+def _client(request):
+    """(identity, role) for the request, from the access token when one is valid."""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        try:
+            payload = decode_token(auth_header[len('Bearer '):].strip())
+            return f"user_{payload['user_id']}", payload.get('role', 'None')
+        except (jwt.InvalidTokenError, KeyError):
+            pass
+    return f"ip_{request.META.get('REMOTE_ADDR', '')}", None
+
+
+def _locally_blocked(key):
+    """Seconds left on a refusal remembered in this process, or 0."""
+    deadline = _blocked_until.get(key)
+    if deadline is None:
+        return 0
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        _blocked_until.pop(key, None)
+        return 0
+    return remaining
+
+
+def _remember_block(key, seconds):
+    with _blocked_lock:
+        if len(_blocked_until) >= _MAX_BLOCKED_ENTRIES:
+            now = time.monotonic()
+            for stale in [k for k, deadline in _blocked_until.items() if deadline <= now]:
+                del _blocked_until[stale]
+            if len(_blocked_until) >= _MAX_BLOCKED_ENTRIES:
+                _blocked_until.clear()
+        _blocked_until[key] = time.monotonic() + seconds
+
+
+def check_rate_limit(url_name, identity, role):
+    """
+    Consume one request from the caller's bucket. Returns the number of
+    seconds to wait before retrying, or 0 when the request may proceed.
+    """
+    limits = settings.RATE_LIMITS.get(url_name)
+    if not limits:
+        return 0
+    capacity, period = limits.get(role) or limits['default']
+    key = f"rate_limit_{url_name}_{identity}"
+
+    remaining = _locally_blocked(key)
+    if remaining:
+        REGISTRY.record_rate_limit(url_name, 'limited_local')
+        return remaining
+
+    allowed, wait_ms = _TOKEN_BUCKET_SCRIPT(keys=[key], args=[capacity, capacity / period, time.time()])
+    if allowed:
+        REGISTRY.record_rate_limit(url_name, 'allowed')
+        return 0
+    _remember_block(key, wait_ms / 1000)
+    REGISTRY.record_rate_limit(url_name, 'limited')
+    return wait_ms / 1000
+
+
+class RateLimitMiddleware:
+    """Refuse requests over their endpoint's limit with 429 and Retry-After."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        if url_name not in settings.RATE_LIMITS:
+            return None
+
+        identity, role = _client(request)
+        retry_after = check_rate_limit(url_name, identity, role)
+        if not retry_after:
+            return None
+
+        response = format_response(
+            message="Error : Too many requests, try again later",
+            data=[],
+            http_status=429
+        )
+        response['Retry-After'] = str(math.ceil(retry_after))
+        return response
@@ -12,6 +12,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -53,25 +58,81 @@ INSTALLED_APPS = [
     
     # Your custom apps
     'apps.users',
+    'apps.auth',
     'apps.projects',
     'apps.features',
     'apps.issues',
+    'apps.monitoring',
+    'apps.jobs',
+    'apps.events',
+    'apps.webhooks',
 ]
 
 
 JWT_SECRET_KEY = SECRET_KEY 
-JWT_ALGORITHM = 'HS256'
+# HS256 signs with JWT_SECRET_KEY. RS256/EdDSA sign with JWT_KEYS_DIR/<JWT_ACTIVE_KID>.pem
+# and publish every JWT_KEYS_DIR/<kid>.pub.pem at /api/auth/jwks/ so other services can
+# verify tokens themselves. Rotate by adding a key pair, switching JWT_ACTIVE_KID and
+# removing the old public key once its tokens have expired.
+JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+JWT_KEYS_DIR = os.environ.get('JWT_KEYS_DIR', BASE_DIR / 'keys')
+JWT_ACTIVE_KID = os.environ.get('JWT_ACTIVE_KID')
+if JWT_ALGORITHM in ('RS256', 'EdDSA') and not JWT_ACTIVE_KID:
+    raise ImproperlyConfigured(f"JWT_ACTIVE_KID must be set when JWT_ALGORITHM is {JWT_ALGORITHM}")
+# Minimum seconds between rescans of JWT_KEYS_DIR triggered by tokens with an unknown kid
+JWT_KEYS_RELOAD_INTERVAL = 30
+JWKS_CACHE_SECONDS = 300
+# Access tokens embed a permission bitmask; how long a process trusts its cached
+# permission version before re-reading it from Redis
+PERMISSION_VERSION_CACHE_SECONDS = 5
+# request.user on token-authenticated requests loads the user row lazily through a
+# small per-process cache
+TOKEN_USER_CACHE_SECONDS = 30
+TOKEN_USER_CACHE_SIZE = 10000
 JWT_ACCESS_TOKEN_LIFETIME = 3600  # 60 minutes in seconds
 JWT_REFRESH_TOKEN_LIFETIME = 604800  # 7 days in seconds
 
+OTP_LIFETIME = 300  # 5 minutes in seconds
+OTP_MAX_ATTEMPTS = 5  # wrong guesses before the OTP is discarded
+
+# OTP delivery (apps.auth.otp_delivery); run `manage.py run_otp_worker` to send queued OTPs
+OTP_DELIVERY = {
+    'BACKEND': 'apps.auth.otp_delivery.RedisQueueBackend',  # InProcessBackend for tests
+    'TRANSPORT': 'apps.auth.otp_delivery.ConsoleTransport',  # or FileTransport
+    'FILE_PATH': BASE_DIR / 'otp_outbox.log',  # FileTransport only; git-ignored, owner-readable
+    'BATCH_SIZE': 50,
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 0.5,  # seconds, doubled on every retry
+    'MAX_DEAD_LETTERS': 1000,  # newest undeliverable messages kept (without their OTP)
+}
+
+
+# Redis
+# A single connection pool (owned by the default cache) is shared by the cache,
+# token blacklist, OTP storage and every other Redis user via apps.utils.REDIS_CLIENT.
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1')  # Use a different DB (e.g., 1) to avoid conflicts
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+REDIS_SOCKET_TIMEOUT = 2  # seconds
+REDIS_SOCKET_CONNECT_TIMEOUT = 2  # seconds
+REDIS_RETRY_ATTEMPTS = 3
+
 
 # Cache Configuration
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://127.0.0.1:6379/1',  # Use a different DB (e.g., 1) to avoid conflicts
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'REDIS_CLIENT_CLASS': 'apps.monitoring.redis_client.InstrumentedRedis',
+            'SOCKET_TIMEOUT': REDIS_SOCKET_TIMEOUT,
+            'SOCKET_CONNECT_TIMEOUT': REDIS_SOCKET_CONNECT_TIMEOUT,
+            'CONNECTION_POOL_KWARGS': {
+                'max_connections': REDIS_MAX_CONNECTIONS,
+                'health_check_interval': 30,
+                'retry_on_timeout': True,
+                'retry': Retry(ExponentialBackoff(cap=1, base=0.05), REDIS_RETRY_ATTEMPTS),
+            },
         }
     }
 }
@@ -84,8 +145,12 @@ CORS_ALLOW_METHODS = ['DELETE', 'GET', 'OPTIONS', 'PATCH', 'POST', 'PUT']
 
 
 MIDDLEWARE = [
+    'apps.monitoring.middleware.PerformanceMiddleware',  # keep first: times the whole stack
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'issue_tracker_api.rate_limiting.RateLimitMiddleware',
+    'issue_tracker_api.db_routing.ReplicaRoutingMiddleware',
+    'apps.monitoring.queries.QueryInspectorMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -95,6 +160,20 @@ MIDDLEWARE = [
 ]
 
 
+# Performance instrumentation (apps.monitoring)
+PERFORMANCE_METRICS_WINDOW = 1024  # recent requests per URL name used for p50/p95/p99
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']  # clients allowed to scrape /internal/metrics/
+
+# Slow-query / N+1 detection (apps.monitoring.queries). Strict mode raises
+# QueryBudgetExceeded instead of logging; enable it in CI with QUERY_INSPECTOR_STRICT=1.
+QUERY_INSPECTOR = {
+    'ENABLED': DEBUG or os.environ.get('QUERY_INSPECTOR_STRICT') == '1',
+    'STRICT': os.environ.get('QUERY_INSPECTOR_STRICT') == '1',
+    'REPEAT_THRESHOLD': 3,  # same fingerprint more often than this per request is flagged
+    'SLOW_QUERY_MS': 100,
+}
+
+
 # Add this to handle the CustomUser model
 AUTH_USER_MODEL = 'users.CustomUser'
 
@@ -105,6 +184,9 @@ sys.path.insert(0, os.path.join(BASE_DIR, 'apps'))
 
 ROOT_URLCONF = 'issue_tracker_api.urls'
 
+# Plain `manage.py test` runs the tests under apps/ (see test_runner.py)
+TEST_RUNNER = 'issue_tracker_api.test_runner.AppsDiscoverRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -133,6 +215,112 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# GET requests read round-robin from these aliases; writes, and reads after a
+# write in the same request/session, stay on 'default'. For local testing point
+# DB_REPLICA_PATHS at copies of db.sqlite3 (comma separated).
+DATABASE_REPLICAS = []
+for _index, _replica_path in enumerate(filter(None, os.environ.get('DB_REPLICA_PATHS', '').split(',')), start=1):
+    DATABASES[f'replica_{_index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _replica_path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+
+DATABASE_ROUTERS = ['issue_tracker_api.db_routing.PrimaryReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = 5  # keep a client on the primary this long after it writes
+
+
+# Password hashing
+# PASSWORD_HASHER selects the hasher for new hashes: 'pbkdf2' (default), 'argon2'
+# (requires argon2-cffi) or 'bcrypt' (requires bcrypt). The others stay listed so
+# existing hashes keep verifying and are upgraded on the next successful login.
+PASSWORD_HASHER_COST = {
+    'PBKDF2_ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 1_000_000)),
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,  # KiB
+    'ARGON2_PARALLELISM': 1,
+    'BCRYPT_ROUNDS': 12,
+}
+_PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'apps.auth.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'apps.auth.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'apps.auth.hashers.TunedBCryptSHA256PasswordHasher',
+}
+_preferred_hasher = _PASSWORD_HASHER_CLASSES[os.environ.get('PASSWORD_HASHER', 'pbkdf2')]
+PASSWORD_HASHERS = [_preferred_hasher] + [
+    hasher for hasher in _PASSWORD_HASHER_CLASSES.values() if hasher != _preferred_hasher
+]
+PASSWORD_HASH_WORKERS = 4  # threads verifying passwords for the async login view
+
+# Login attempts allowed per sliding window before login answers 429; each attempt is
+# counted before hashing and uncounted again if it succeeds
+LOGIN_THROTTLE = {
+    'WINDOW': 300,  # seconds
+    'MAX_FAILURES_PER_USERNAME': 5,
+    'MAX_FAILURES_PER_IP': 50,
+}
+
+# Single-flight coalescing of identical expensive GETs (apps.utils.coalesce_requests)
+REQUEST_COALESCING = {
+    'LOCK_TIMEOUT': 10,  # seconds a leader may hold the cross-process lock
+    'RESULT_TTL': 2,  # seconds a leader's followers in other processes can pick up its result
+    'POLL_INTERVAL': 0.05,  # seconds between a follower's checks for the result
+}
+
+# Project x feature matrix (apps.features.matrix); entries are also invalidated on every change
+FEATURE_MATRIX_CACHE_SECONDS = 300
+
+# Upper bound on rows a single bulk endpoint request may create or update
+BULK_MAX_ITEMS = 1000
+
+# Background jobs (apps.jobs); run workers with `manage.py run_worker`
+JOBS = {
+    'BACKEND': os.environ.get('JOBS_BACKEND', 'apps.jobs.backends.RedisBackend'),  # InMemoryBackend runs jobs inline
+    'VISIBILITY_TIMEOUT': 300,  # seconds before an unacknowledged job is handed out again
+    'MAX_RETRIES': 3,
+    'RETRY_BACKOFF': 5,  # seconds, doubled after every failed attempt
+    'RESULT_TTL': 86400,  # seconds job status stays queryable
+    'POLL_INTERVAL': 1,  # seconds an idle worker waits between polls
+}
+
+# Background project deletion (apps.projects.jobs)
+PROJECT_DELETION = {
+    'BATCH_SIZE': 1000,  # issues removed per DELETE statement
+}
+
+# Server-Sent Events change feed (apps.events); serve it through asgi.py with uvicorn
+EVENTS = {
+    'STREAM_MAXLEN': 1000,  # approximate events kept per project for Last-Event-ID resume
+    'HEARTBEAT_SECONDS': 15,  # keep-alive comment interval on idle connections
+    'CLIENT_BUFFER': 100,  # undelivered events per connection before it is closed
+}
+
+# Outgoing issue webhooks (apps.webhooks); run `manage.py run_webhook_dispatcher` to deliver them
+WEBHOOKS = {
+    'BATCH_SIZE': 100,  # events taken from the queue per round
+    'MAX_WORKERS': 16,  # concurrent HTTP requests across all endpoints
+    'PER_ENDPOINT_CONCURRENCY': 2,  # concurrent HTTP requests to any single URL
+    'MAX_BACKLOG_PER_ENDPOINT': 100,  # deliveries held in memory per URL; more wait in Redis
+    'TIMEOUT': 5,  # seconds per HTTP request
+    'MAX_ATTEMPTS': 6,  # attempts before a delivery is dead-lettered
+    'MAX_DEAD_LETTERS': 1000,  # newest dead-lettered deliveries kept; older ones are dropped
+    'RETRY_BACKOFF': 10,  # seconds, doubled after every failed attempt
+    'POLL_TIMEOUT': 1,  # seconds an idle dispatcher blocks waiting for events
+    # Allow loopback/private targets; only for local testing with webhook_echo_server
+    'ALLOW_PRIVATE_TARGETS': os.environ.get('WEBHOOKS_ALLOW_PRIVATE_TARGETS') == '1',
+}
+
+# API rate limits (issue_tracker_api.rate_limiting), keyed by URL name and then by the
+# role in the caller's access token; 'default' covers other roles and anonymous clients.
+# (capacity, period): bursts of up to `capacity` requests, refilled at capacity/period per second.
+RATE_LIMITS = {
+    'list_issues': {'default': (120, 60), 'Admin': (600, 60)},
+    'create_issue': {'default': (30, 60), 'Admin': (120, 60)},
+    'update_issue': {'default': (60, 60), 'Admin': (240, 60)},
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,12 @@
+from django.test.runner import DiscoverRunner
+
+
+class AppsDiscoverRunner(DiscoverRunner):
+    """Run the tests under apps/ when `manage.py test` is given no labels.
+
+    Discovering from the project root imports issues/tests.py, which clashes
+    with apps/issues because settings puts apps/ on sys.path.
+    """
+
+    def build_suite(self, test_labels=None, **kwargs):
+        return super().build_suite(test_labels or ['apps'], **kwargs)
@@ -23,5 +23,9 @@ urlpatterns = [
     path('api/users/', include('apps.users.urls')),
     path('api/projects/', include('apps.projects.urls')),
     path('api/features/', include('apps.features.urls')),
-    path('api/issues/', include('apps.issues.urls'))
+    path('api/issues/', include('apps.issues.urls')),
+    path('api/jobs/', include('apps.jobs.urls')),
+    path('api/events/', include('apps.events.urls')),
+    path('api/webhooks/', include('apps.webhooks.urls')),
+    path('internal/', include('apps.monitoring.urls')),
 ]